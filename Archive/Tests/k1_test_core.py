@@ -0,0 +1,149 @@
+"""
+k1_test_core.py - Field comparison core for the comprehensive K-1 test
+======================================================================
+Comparators, display formatters and the per-field check used by
+test_simple_k1_2024.py. Kept free of PDF and logging dependencies so it
+can be compiled with mypyc:
+
+    cd Archive/Tests && mypyc k1_test_core.py
+
+The compiled extension is picked up by the same import; without it the
+module runs as plain Python.
+"""
+
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+
+class FieldResult(NamedTuple):
+    """Outcome of a single field test"""
+    field: str
+    description: str
+    expected: Any
+    actual: Any
+    status: str  # 'PASS', 'FAIL' or 'SKIP'
+
+
+def clean_string(value: str) -> Tuple[str, Tuple[str, ...]]:
+    """Case-folded, stripped string and its stripped lines, for string comparisons"""
+    return value.casefold().strip(), tuple(p.strip().casefold() for p in value.split('\n'))
+
+
+# ========== COMPARATORS ==========
+# Each takes (actual, expected, tolerance) and returns 'PASS', 'FAIL' or 'SKIP'
+
+def _cmp_none(actual_value: Any, expected_value: Any, tolerance: float) -> str:
+    """Nothing expected: skip if nothing was extracted, fail otherwise"""
+    return "SKIP" if actual_value is None else "FAIL"
+
+
+def _cmp_default(actual_value: Any, expected_value: Any, tolerance: float) -> str:
+    """Direct comparison (also fails when the value wasn't extracted)"""
+    return "PASS" if expected_value == actual_value else "FAIL"
+
+
+def _cmp_num(actual_value: Any, expected_value: Any, tolerance: float) -> str:
+    """Numeric comparison with tolerance"""
+    if isinstance(actual_value, (int, float)):
+        return "PASS" if abs(expected_value - actual_value) <= tolerance else "FAIL"
+    return _cmp_default(actual_value, expected_value, tolerance)
+
+
+def _cmp_bool(actual_value: Any, expected_value: Any, tolerance: float) -> str:
+    """Checkbox comparison (exact; bools never get the numeric tolerance)"""
+    return "PASS" if expected_value == actual_value else "FAIL"
+
+
+def _cmp_str(actual_value: Any, expected_value: Any, tolerance: float,
+             expected_clean: Optional[Tuple[str, Tuple[str, ...]]] = None) -> str:
+    """
+    String comparison (case-insensitive, partial match)
+
+    expected_clean is the precomputed clean_string(expected_value), if available.
+    """
+    if not isinstance(actual_value, str):
+        return _cmp_default(actual_value, expected_value, tolerance)
+
+    # Clean up strings for comparison
+    exp_clean, exp_parts = expected_clean or clean_string(expected_value)
+    act_clean = actual_value.casefold().strip()
+
+    # Check for partial matches or exact matches
+    if exp_clean in act_clean or act_clean in exp_clean:
+        return "PASS"
+
+    # Also check if multi-line addresses match partially
+    if len(exp_parts) > 1 or '\n' in actual_value:
+        act_parts = [p.strip().casefold() for p in actual_value.split('\n')]
+        # Whole-line matches first, then a substring scan of the joined lines
+        if not frozenset(act_parts).isdisjoint(exp_parts):
+            return "PASS"
+        act_joined = ' '.join(act_parts)
+        if any(ep in act_joined for ep in exp_parts):
+            return "PASS"
+
+    return "FAIL"
+
+
+# Comparators keyed on type(expected_value)
+_COMPARATORS: Dict[type, Callable[[Any, Any, float], str]] = {
+    float: _cmp_num,
+    int: _cmp_num,
+    str: _cmp_str,
+    bool: _cmp_bool,
+    type(None): _cmp_none,
+}
+
+
+# ========== DISPLAY FORMATTERS ==========
+# Keyed on type(expected_value); each returns (expected, actual) strings
+
+def _fmt_float(expected_value: Any, actual_value: Any) -> Tuple[str, str]:
+    return f"${expected_value:,.2f}", f"${actual_value:,.2f}" if actual_value is not None else "None/Empty"
+
+
+def _fmt_bool(expected_value: Any, actual_value: Any) -> Tuple[str, str]:
+    return ("Checked" if expected_value else "Not Checked"), ("Checked" if actual_value else "Not Checked")
+
+
+def _fmt_none(expected_value: Any, actual_value: Any) -> Tuple[str, str]:
+    return "Empty/None", str(actual_value) if actual_value is not None else "Empty/None"
+
+
+def _trunc(value: Any, n: int = 50) -> str:
+    s = str(value)
+    return s[:n] + "..." if len(s) > n else s
+
+
+def _fmt_str(expected_value: Any, actual_value: Any) -> Tuple[str, str]:
+    return _trunc(expected_value), _trunc(actual_value) if actual_value is not None else "None/Empty"
+
+
+_FORMATTERS: Dict[type, Callable[[Any, Any], Tuple[str, str]]] = {
+    float: _fmt_float,
+    bool: _fmt_bool,
+    type(None): _fmt_none,
+}
+
+
+# Emoji and status tag that start each field's log line
+_STATUS_PREFIX: Dict[str, str] = {"PASS": "✅ [PASS] ", "FAIL": "❌ [FAIL] ", "SKIP": "⭕️ [SKIP] "}
+
+
+def check_field(field_name: str, actual_value: Any, expected_value: Any, tolerance: float = 1.0,
+                expected_clean: Optional[Tuple[str, Tuple[str, ...]]] = None) -> Tuple[str, str]:
+    """
+    Compare one field and format its log line.
+    Returns: (status, log line)
+    """
+    if expected_clean is not None:
+        status = _cmp_str(actual_value, expected_value, tolerance, expected_clean)
+    else:
+        status = _COMPARATORS.get(type(expected_value), _cmp_default)(actual_value, expected_value, tolerance)
+
+    # Format values for display
+    exp_str, act_str = _FORMATTERS.get(type(expected_value), _fmt_str)(expected_value, actual_value)
+
+    line = (_STATUS_PREFIX[status] + field_name.ljust(45) + " | Expected: " + exp_str.ljust(30)
+            + " | Got: " + act_str.ljust(30))
+
+    return status, line
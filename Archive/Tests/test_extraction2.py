@@ -5,15 +5,98 @@ Tests all fields that are extracted versus expected values.
 Provides detailed reporting on extraction accuracy.
 """
 
+import io
 import os
-from typing import Dict, List, Tuple, Any
+import sys
+import hashlib
+import pickle
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from types import MappingProxyType
+from typing import Dict, List, Tuple, Any, Mapping, Optional
 from dataclasses import dataclass
 from extractor import K1Extractor
 from models import K1Data, ExtractionResult
-import json
+import numpy as np
+import orjson
 
 
-@dataclass
+# Pickled extraction results, keyed by PDF path + mtime + size
+CACHE_DIR = ".cache"
+
+# Minimum percentage of fields that must pass
+PASS_THRESHOLD = 80
+
+# Field categories and the notes attached to their test results
+CATEGORY_NOTES = {
+    'entity': "Entity information",
+    'box': "Box value from Part III",
+    'capital': "Capital account from Part L",
+    'percentage': "Ownership percentage",
+}
+
+# (field name, category, optional getter) for every field under test, in report order.
+# Fields without a getter are read straight off K1Data with getattr.
+FIELD_SPECS = (
+    # Entity information
+    ('form_type', 'entity', lambda d: d.form_type.value if d.form_type else None),
+    ('tax_year', 'entity', None),
+    ('ein', 'entity', None),
+    ('entity_name', 'entity', None),
+    
+    # Box values (Part III)
+    ('box_1_ordinary_income', 'box', None),
+    ('box_2_rental_real_estate', 'box', None),
+    ('box_3_other_rental', 'box', None),
+    ('box_4_guaranteed_payments', 'box', None),
+    ('box_5_interest_income', 'box', None),
+    ('box_6a_ordinary_dividends', 'box', None),
+    ('box_6b_qualified_dividends', 'box', None),
+    ('box_7_royalties', 'box', None),
+    ('box_8_net_short_term_gain', 'box', None),
+    ('box_9a_net_long_term_gain', 'box', None),
+    ('box_10_net_1231_gain', 'box', None),
+    ('box_11_other_income', 'box', None),
+    ('box_12_section_179', 'box', None),
+    ('box_19_distributions', 'box', None),
+    
+    # Capital account (Part L)
+    ('capital_beginning', 'capital', None),
+    ('capital_ending', 'capital', None),
+    ('capital_contributions', 'capital', None),
+    ('capital_distributions', 'capital', None),
+    
+    # Ownership percentages
+    ('profit_sharing_percent', 'percentage', None),
+    ('loss_sharing_percent', 'percentage', None),
+    ('capital_percent', 'percentage', None),
+)
+
+# Box fields where a missing value counts as 0
+ZERO_DEFAULT_FIELDS = frozenset(name for name, category, _ in FIELD_SPECS if category == 'box')
+
+# Dollar and percentage fields, compared numerically with a tolerance
+NUMERIC_FIELDS = frozenset(name for name, category, _ in FIELD_SPECS if category != 'entity')
+
+# Fields that are skipped when no expected value is given
+OPTIONAL_FIELDS = frozenset(name for name, category, _ in FIELD_SPECS if category == 'percentage')
+
+# Bound format methods, so the format spec is parsed once rather than per row
+_fmt_money = "${:,.2f}".format
+_fmt_pct = "{:.2f}%".format
+
+
+def fmt_money(value: Any) -> str:
+    """Format a dollar amount for the report, or 'None' if missing"""
+    return "None" if value is None else _fmt_money(value)
+
+
+def fmt_pct(value: Any) -> str:
+    """Format a percentage for the report, or 'None' if missing"""
+    return "None" if value is None else _fmt_pct(value)
+
+
+@dataclass(slots=True, frozen=True)
 class FieldTest:
     """Represents a single field test case"""
     field_name: str
@@ -21,6 +104,19 @@ class FieldTest:
     actual_value: Any
     passed: bool
     notes: str = ""
+    category: str = ""  # key of CATEGORY_NOTES
+    checked: bool = True  # False if skipped once the pass threshold was out of reach
+    
+    def to_export_dict(self) -> Dict[str, Any]:
+        """Dict in the exported JSON schema"""
+        return {
+            'field': self.field_name,
+            'expected': self.expected_value,
+            'actual': self.actual_value,
+            'passed': self.passed,
+            'category': self.category,
+            'notes': self.notes
+        }
 
 
 class K1ExtractionTester:
@@ -29,8 +125,48 @@ class K1ExtractionTester:
     Tests all fields and provides detailed reporting.
     """
     
-    def __init__(self, verbose: bool = True):
+    # Expected values for the Enviva sample K-1. These are the actual values
+    # from the PDF that should be extracted; update them for your test PDF.
+    # Read-only and built once, so batch runs share it.
+    _EXPECTED = MappingProxyType({
+        # Entity Information
+        'form_type': '1065',  # Partnership K-1
+        'tax_year': '2023',
+        'ein': '56-2178030',  # Enviva's EIN
+        'entity_name': 'Enviva Partners, LP',
+        
+        # Box Values (Part III)
+        'box_1_ordinary_income': -27942.0,  # Loss shown as negative
+        'box_2_rental_real_estate': 0.0,
+        'box_3_other_rental': 0.0,
+        'box_4_guaranteed_payments': 0.0,
+        'box_5_interest_income': 0.0,
+        'box_6a_ordinary_dividends': 0.0,
+        'box_6b_qualified_dividends': 0.0,
+        'box_7_royalties': 0.0,
+        'box_8_net_short_term_gain': 0.0,
+        'box_9a_net_long_term_gain': 0.0,
+        'box_10_net_1231_gain': 0.0,
+        'box_11_other_income': 0.0,
+        'box_12_section_179': 0.0,
+        'box_19_distributions': 25100.0,  # Cash distributions
+        
+        # Capital Account (Part L)
+        'capital_beginning': 1076588.0,
+        'capital_ending': 1024146.0,
+        'capital_contributions': 0.0,
+        'capital_distributions': 25100.0,  # Should match box 19
+        
+        # Ownership Percentages
+        # These might not be directly shown, so they're optional
+        'profit_sharing_percent': None,
+        'loss_sharing_percent': None,
+        'capital_percent': None,
+    })
+    
+    def __init__(self, verbose: bool = True, use_cache: bool = True):
         self.verbose = verbose
+        self.use_cache = use_cache
         self.extractor = K1Extractor(verbose=False)  # Less verbose for testing
         
     def print_header(self, text: str):
@@ -45,48 +181,11 @@ class K1ExtractionTester:
         print(f"  {text}")
         print(f"{'─'*50}")
     
-    def get_expected_values(self) -> Dict:
+    def get_expected_values(self) -> Mapping[str, Any]:
         """
-        Define expected values for the Enviva sample K-1.
-        
-        These are the actual values from the PDF that should be extracted.
-        Update these based on your specific test PDF.
+        Expected values for the Enviva sample K-1 (read-only).
         """
-        return {
-            # Entity Information
-            'form_type': '1065',  # Partnership K-1
-            'tax_year': '2023',
-            'ein': '56-2178030',  # Enviva's EIN
-            'entity_name': 'Enviva Partners, LP',
-            
-            # Box Values (Part III)
-            'box_1_ordinary_income': -27942.0,  # Loss shown as negative
-            'box_2_rental_real_estate': 0.0,
-            'box_3_other_rental': 0.0,
-            'box_4_guaranteed_payments': 0.0,
-            'box_5_interest_income': 0.0,
-            'box_6a_ordinary_dividends': 0.0,
-            'box_6b_qualified_dividends': 0.0,
-            'box_7_royalties': 0.0,
-            'box_8_net_short_term_gain': 0.0,
-            'box_9a_net_long_term_gain': 0.0,
-            'box_10_net_1231_gain': 0.0,
-            'box_11_other_income': 0.0,
-            'box_12_section_179': 0.0,
-            'box_19_distributions': 25100.0,  # Cash distributions
-            
-            # Capital Account (Part L)
-            'capital_beginning': 1076588.0,
-            'capital_ending': 1024146.0,
-            'capital_contributions': 0.0,
-            'capital_distributions': 25100.0,  # Should match box 19
-            
-            # Ownership Percentages
-            # These might not be directly shown, so they're optional
-            'profit_sharing_percent': None,
-            'loss_sharing_percent': None,
-            'capital_percent': None,
-        }
+        return self._EXPECTED
     
     def compare_values(self, expected: Any, actual: Any, tolerance: float = 1.0) -> bool:
         """
@@ -116,139 +215,168 @@ class K1ExtractionTester:
         # Direct comparison for other types
         return expected == actual
     
-    def test_extraction(self, pdf_path: str) -> Tuple[List[FieldTest], ExtractionResult]:
+    def compare_numeric(self, fields: List[Tuple[str, Any, Any]], tolerance: float = 1.0) -> Dict[str, bool]:
+        """
+        Compare numeric fields in one vectorized pass.
+        
+        Args:
+            fields: (field name, expected, actual) tuples; None means missing
+            tolerance: Acceptable absolute difference
+            
+        Returns:
+            Dict of field name -> passed. Two missing values count as a match.
+        """
+        if not fields:
+            return {}
+        
+        names = [name for name, _, _ in fields]
+        expected = np.array([np.nan if e is None else e for _, e, _ in fields], dtype=np.float64)
+        actual = np.array([np.nan if a is None else a for _, _, a in fields], dtype=np.float64)
+        
+        # NaN compares False, so a single missing side fails the tolerance check
+        passed = (np.abs(expected - actual) <= tolerance) | (np.isnan(expected) & np.isnan(actual))
+        
+        return dict(zip(names, passed.tolist()))
+    
+    def extract_cached(self, pdf_path: str) -> ExtractionResult:
+        """
+        Run extract_from_pdf, reusing the pickled result from a previous run
+        while the PDF is unchanged (same path, mtime and size).
+        """
+        if not self.use_cache:
+            return self.extractor.extract_from_pdf(pdf_path)
+        
+        stamp = f"{pdf_path}:{os.path.getmtime(pdf_path)}:{os.path.getsize(pdf_path)}"
+        key = hashlib.blake2b(stamp.encode()).hexdigest()
+        cache_file = os.path.join(CACHE_DIR, f"{key}.pkl")
+        
+        if os.path.exists(cache_file):
+            with open(cache_file, 'rb') as f:
+                return pickle.load(f)
+        
+        result = self.extractor.extract_from_pdf(pdf_path)
+        
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(cache_file, 'wb') as f:
+            pickle.dump(result, f)
+        
+        return result
+    
+    def test_extraction(self, pdf_path: str,
+                        min_pass_rate: Optional[float] = None) -> Tuple[List[FieldTest], ExtractionResult]:
         """
         Test extraction on a PDF file.
         
+        Args:
+            pdf_path: PDF to extract
+            min_pass_rate: Stop comparing once this pass rate (%) can't be reached
+        
         Returns:
             Tuple of (test results, extraction result)
         """
         # Extract the PDF
-        result = self.extractor.extract_from_pdf(pdf_path)
+        result = self.extract_cached(pdf_path)
         
-        if not result.success or not result.data:
-            return [], result
+        return self.check_fields(result, min_pass_rate), result
+    
+    def test_extraction_batch(self, pdf_paths: List[str],
+                              min_pass_rate: Optional[float] = None) -> Dict[str, Tuple[List[FieldTest], ExtractionResult]]:
+        """
+        Test extraction on several PDFs, parsing them in parallel processes.
         
-        # Get expected values
-        expected = self.get_expected_values()
+        Extraction is CPU bound and independent per file, so each PDF goes to
+        its own worker; the field comparison runs here on the returned results.
         
-        # Test each field
-        test_results = []
-        k1_data = result.data
+        Returns:
+            Dict of PDF path -> (test results, extraction result)
+        """
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
+            results = pool.map(_extract_in_worker, pdf_paths, [self.use_cache] * len(pdf_paths))
+            return {
+                pdf_path: (self.check_fields(result, min_pass_rate), result)
+                for pdf_path, result in zip(pdf_paths, results)
+            }
+    
+    def check_fields(self, result: ExtractionResult,
+                     min_pass_rate: Optional[float] = None) -> List[FieldTest]:
+        """
+        Compare an extraction result against the expected values.
         
-        # Test entity fields
-        entity_fields = [
-            ('form_type', k1_data.form_type.value if k1_data.form_type else None),
-            ('tax_year', k1_data.tax_year),
-            ('ein', k1_data.ein),
-            ('entity_name', k1_data.entity_name),
-        ]
+        Numeric fields are checked first in one pass. If min_pass_rate is set,
+        the remaining fields are skipped as soon as that rate is out of reach;
+        they are reported as failed with checked=False.
+        """
+        if not result.success or not result.data:
+            return []
         
-        for field_name, actual_value in entity_fields:
-            expected_value = expected.get(field_name)
-            passed = self.compare_values(expected_value, actual_value)
-            
-            test = FieldTest(
-                field_name=field_name,
-                expected_value=expected_value,
-                actual_value=actual_value,
-                passed=passed,
-                notes="Entity information"
-            )
-            test_results.append(test)
-        
-        # Test box values
-        box_fields = [
-            'box_1_ordinary_income',
-            'box_2_rental_real_estate',
-            'box_3_other_rental',
-            'box_4_guaranteed_payments',
-            'box_5_interest_income',
-            'box_6a_ordinary_dividends',
-            'box_6b_qualified_dividends',
-            'box_7_royalties',
-            'box_8_net_short_term_gain',
-            'box_9a_net_long_term_gain',
-            'box_10_net_1231_gain',
-            'box_11_other_income',
-            'box_12_section_179',
-            'box_19_distributions',
-        ]
+        expected = self._EXPECTED
+        k1_data = result.data
         
-        for field_name in box_fields:
-            actual_value = getattr(k1_data, field_name, None)
+        rows = []
+        for field_name, category, getter in FIELD_SPECS:
             expected_value = expected.get(field_name)
             
-            # Special handling for fields that might not be present
-            if expected_value == 0.0 and actual_value is None:
-                actual_value = 0.0  # Treat None as 0 for zero-value boxes
+            # Skip optional fields not shown in the PDF
+            if field_name in OPTIONAL_FIELDS and expected_value is None:
+                continue
             
-            passed = self.compare_values(expected_value, actual_value)
+            actual_value = getter(k1_data) if getter else getattr(k1_data, field_name, None)
             
-            test = FieldTest(
-                field_name=field_name,
-                expected_value=expected_value,
-                actual_value=actual_value,
-                passed=passed,
-                notes="Box value from Part III"
-            )
-            test_results.append(test)
-        
-        # Test capital account fields
-        capital_fields = [
-            'capital_beginning',
-            'capital_ending',
-            'capital_contributions',
-            'capital_distributions',
-        ]
-        
-        for field_name in capital_fields:
-            actual_value = getattr(k1_data, field_name, None)
-            expected_value = expected.get(field_name)
-            passed = self.compare_values(expected_value, actual_value)
+            # Treat None as 0 for zero-value boxes
+            if field_name in ZERO_DEFAULT_FIELDS and expected_value == 0.0 and actual_value is None:
+                actual_value = 0.0
             
-            test = FieldTest(
-                field_name=field_name,
-                expected_value=expected_value,
-                actual_value=actual_value,
-                passed=passed,
-                notes="Capital account from Part L"
-            )
-            test_results.append(test)
+            rows.append((field_name, category, expected_value, actual_value))
         
-        # Test percentage fields (if available)
-        percentage_fields = [
-            'profit_sharing_percent',
-            'loss_sharing_percent',
-            'capital_percent',
-        ]
+        passed = self.compare_numeric(
+            [(name, exp, act) for name, _, exp, act in rows if name in NUMERIC_FIELDS]
+        )
         
-        for field_name in percentage_fields:
-            actual_value = getattr(k1_data, field_name, None)
-            expected_value = expected.get(field_name)
-            
-            # Skip if expected is None (not shown in PDF)
-            if expected_value is None:
+        total = len(rows)
+        failed = sum(1 for ok in passed.values() if not ok)
+        for field_name, _, expected_value, actual_value in rows:
+            if field_name in passed:
                 continue
-                
-            passed = self.compare_values(expected_value, actual_value)
             
-            test = FieldTest(
+            # Prune: even if every remaining field passed, the threshold is missed
+            if min_pass_rate is not None and (total - failed) / total * 100 < min_pass_rate:
+                break
+            
+            passed[field_name] = self.compare_values(expected_value, actual_value)
+            if not passed[field_name]:
+                failed += 1
+        
+        test_results = [
+            FieldTest(
                 field_name=field_name,
                 expected_value=expected_value,
                 actual_value=actual_value,
-                passed=passed,
-                notes="Ownership percentage"
+                passed=passed.get(field_name, False),
+                notes=CATEGORY_NOTES[category],
+                category=category,
+                checked=field_name in passed
             )
-            test_results.append(test)
+            for field_name, category, expected_value, actual_value in rows
+        ]
         
-        return test_results, result
+        return test_results
     
     def print_results(self, test_results: List[FieldTest], extraction_result: ExtractionResult):
         """
         Print detailed test results.
+        
+        The report is assembled in memory and written to stdout in one call.
         """
-        self.print_header("K-1 EXTRACTION TEST RESULTS")
+        buf = io.StringIO()
+        w = buf.write
+        
+        def header(text: str):
+            w("\n" + "="*70 + "\n" + text.center(70) + "\n" + "="*70 + "\n")
+        
+        def section(text: str):
+            w(f"\n{'─'*50}\n  {text}\n{'─'*50}\n")
+        
+        header("K-1 EXTRACTION TEST RESULTS")
         
         # Summary statistics
         total_tests = len(test_results)
@@ -256,98 +384,115 @@ class K1ExtractionTester:
         failed_tests = total_tests - passed_tests
         pass_rate = (passed_tests / total_tests * 100) if total_tests > 0 else 0
         
-        print(f"\n📊 Summary:")
-        print(f"  Total Fields Tested: {total_tests}")
-        print(f"  ✅ Passed: {passed_tests}")
-        print(f"  ❌ Failed: {failed_tests}")
-        print(f"  📈 Pass Rate: {pass_rate:.1f}%")
-        print(f"  ⏱️  Processing Time: {extraction_result.processing_time:.2f}s")
-        print(f"  🔍 Extraction Method: {extraction_result.extraction_method.value}")
+        w(f"\n📊 Summary:\n"
+          f"  Total Fields Tested: {total_tests}\n"
+          f"  ✅ Passed: {passed_tests}\n"
+          f"  ❌ Failed: {failed_tests}\n"
+          f"  📈 Pass Rate: {pass_rate:.1f}%\n"
+          f"  ⏱️  Processing Time: {extraction_result.processing_time:.2f}s\n"
+          f"  🔍 Extraction Method: {extraction_result.extraction_method.value}\n")
         
-        # Group results by category
-        entity_tests = [t for t in test_results if 'Entity' in t.notes]
-        box_tests = [t for t in test_results if 'Box' in t.notes]
-        capital_tests = [t for t in test_results if 'Capital' in t.notes]
-        percentage_tests = [t for t in test_results if 'percentage' in t.notes]
+        # Group results by category in a single pass
+        buckets = defaultdict(list)
+        for t in test_results:
+            buckets[t.category].append(t)
+        entity_tests = buckets['entity']
+        box_tests = buckets['box']
+        capital_tests = buckets['capital']
+        percentage_tests = buckets['percentage']
         
         # Print entity information results
         if entity_tests:
-            self.print_section("Entity Information")
-            for test in entity_tests:
-                status = "✅" if test.passed else "❌"
-                print(f"  {status} {test.field_name:25} Expected: {test.expected_value!r:20} Got: {test.actual_value!r}")
+            section("Entity Information")
+            w("\n".join(
+                f"  {'✅' if t.passed else '❌'} {t.field_name:25} Expected: {t.expected_value!r:20} Got: {t.actual_value!r}"
+                for t in entity_tests
+            ) + "\n")
         
         # Print box value results
         if box_tests:
-            self.print_section("Box Values (Part III)")
-            for test in box_tests:
-                status = "✅" if test.passed else "❌"
-                expected_str = f"${test.expected_value:,.2f}" if test.expected_value is not None else "None"
-                actual_str = f"${test.actual_value:,.2f}" if test.actual_value is not None else "None"
-                print(f"  {status} {test.field_name:25} Expected: {expected_str:15} Got: {actual_str}")
+            section("Box Values (Part III)")
+            w("\n".join(
+                f"  {'✅' if t.passed else '❌'} {t.field_name:25} "
+                f"Expected: {fmt_money(t.expected_value):15} Got: {fmt_money(t.actual_value)}"
+                for t in box_tests
+            ) + "\n")
         
         # Print capital account results
         if capital_tests:
-            self.print_section("Capital Account (Part L)")
-            for test in capital_tests:
-                status = "✅" if test.passed else "❌"
-                expected_str = f"${test.expected_value:,.2f}" if test.expected_value is not None else "None"
-                actual_str = f"${test.actual_value:,.2f}" if test.actual_value is not None else "None"
-                print(f"  {status} {test.field_name:25} Expected: {expected_str:15} Got: {actual_str}")
+            section("Capital Account (Part L)")
+            w("\n".join(
+                f"  {'✅' if t.passed else '❌'} {t.field_name:25} "
+                f"Expected: {fmt_money(t.expected_value):15} Got: {fmt_money(t.actual_value)}"
+                for t in capital_tests
+            ) + "\n")
         
         # Print percentage results (if any)
         if percentage_tests:
-            self.print_section("Ownership Percentages")
-            for test in percentage_tests:
-                status = "✅" if test.passed else "❌"
-                expected_str = f"{test.expected_value:.2f}%" if test.expected_value is not None else "None"
-                actual_str = f"{test.actual_value:.2f}%" if test.actual_value is not None else "None"
-                print(f"  {status} {test.field_name:25} Expected: {expected_str:10} Got: {actual_str}")
+            section("Ownership Percentages")
+            w("\n".join(
+                f"  {'✅' if t.passed else '❌'} {t.field_name:25} "
+                f"Expected: {fmt_pct(t.expected_value):10} Got: {fmt_pct(t.actual_value)}"
+                for t in percentage_tests
+            ) + "\n")
         
         # Print failed tests details
         failed = [t for t in test_results if not t.passed]
         if failed:
-            self.print_section("❌ Failed Extractions - Details")
+            section("❌ Failed Extractions - Details")
             for test in failed:
-                print(f"\n  Field: {test.field_name}")
-                print(f"    Expected: {test.expected_value!r}")
-                print(f"    Got:      {test.actual_value!r}")
-                print(f"    Notes:    {test.notes}")
+                w(f"\n  Field: {test.field_name}\n"
+                  f"    Expected: {test.expected_value!r}\n"
+                  f"    Got:      {test.actual_value!r}\n"
+                  f"    Notes:    {test.notes}\n")
+                if not test.checked:
+                    w("    (not checked: pass threshold already out of reach)\n")
         
         # Capital account reconciliation check
         if extraction_result.data:
-            self.print_section("Validation Checks")
+            section("Validation Checks")
             
             # Check capital account reconciliation
             k1_data = extraction_result.data
-            if all([k1_data.capital_beginning is not None,
-                   k1_data.capital_ending is not None,
-                   k1_data.capital_distributions is not None]):
+            if ((beginning := k1_data.capital_beginning) is not None
+                    and (ending := k1_data.capital_ending) is not None
+                    and (distributions := k1_data.capital_distributions) is not None):
                 
-                expected_ending = k1_data.capital_beginning
-                if k1_data.capital_contributions:
-                    expected_ending += k1_data.capital_contributions
-                if k1_data.box_1_ordinary_income:
-                    expected_ending += k1_data.box_1_ordinary_income
-                if k1_data.capital_distributions:
-                    expected_ending -= k1_data.capital_distributions
+                income = k1_data.box_1_ordinary_income or 0.0
+                expected_ending = beginning + (k1_data.capital_contributions or 0.0) + income - distributions
+                difference = abs(expected_ending - ending)
                 
-                reconciles = abs(expected_ending - k1_data.capital_ending) <= 1.0
-                status = "✅" if reconciles else "⚠️"
+                status = "✅" if difference <= 1.0 else "⚠️"
                 
-                print(f"  {status} Capital Account Reconciliation:")
-                print(f"      Beginning:     ${k1_data.capital_beginning:,.2f}")
-                print(f"      + Income/Loss: ${k1_data.box_1_ordinary_income:,.2f}" if k1_data.box_1_ordinary_income else "      + Income/Loss: $0.00")
-                print(f"      - Distributions: ${k1_data.capital_distributions:,.2f}" if k1_data.capital_distributions else "      - Distributions: $0.00")
-                print(f"      = Expected:    ${expected_ending:,.2f}")
-                print(f"      Actual Ending: ${k1_data.capital_ending:,.2f}")
-                print(f"      Difference:    ${abs(expected_ending - k1_data.capital_ending):,.2f}")
+                w(f"  {status} Capital Account Reconciliation:\n"
+                  f"      Beginning:     {_fmt_money(beginning)}\n"
+                  f"      + Income/Loss: {_fmt_money(income)}\n"
+                  f"      - Distributions: {_fmt_money(distributions)}\n"
+                  f"      = Expected:    {_fmt_money(expected_ending)}\n"
+                  f"      Actual Ending: {_fmt_money(ending)}\n"
+                  f"      Difference:    {_fmt_money(difference)}\n")
         
         # Print warnings if any
         if extraction_result.data and extraction_result.data.warnings:
-            self.print_section("⚠️ Extraction Warnings")
-            for warning in extraction_result.data.warnings:
-                print(f"  • {warning}")
+            section("⚠️ Extraction Warnings")
+            w("".join(f"  • {warning}\n" for warning in extraction_result.data.warnings))
+        
+        sys.stdout.write(buf.getvalue())
+    
+    def summarize(self, test_results: List[FieldTest], extraction_result: ExtractionResult) -> Dict[str, Any]:
+        """
+        Summary block for exported results.
+        """
+        passed = sum(1 for t in test_results if t.passed)
+        return {
+            'total_tests': len(test_results),
+            'passed': passed,
+            'failed': len(test_results) - passed,
+            'pass_rate': passed / len(test_results) * 100 if test_results else 0,
+            'processing_time': extraction_result.processing_time,
+            'extraction_method': extraction_result.extraction_method.value,
+            'incomplete': not all(t.checked for t in test_results)
+        }
     
     def export_results(self, test_results: List[FieldTest], extraction_result: ExtractionResult, 
                       output_file: str = "test_results.json"):
@@ -355,41 +500,54 @@ class K1ExtractionTester:
         Export test results to JSON for further analysis.
         """
         export_data = {
-            'summary': {
-                'total_tests': len(test_results),
-                'passed': sum(1 for t in test_results if t.passed),
-                'failed': sum(1 for t in test_results if not t.passed),
-                'pass_rate': sum(1 for t in test_results if t.passed) / len(test_results) * 100 if test_results else 0,
-                'processing_time': extraction_result.processing_time,
-                'extraction_method': extraction_result.extraction_method.value
-            },
-            'tests': [
-                {
-                    'field': t.field_name,
-                    'expected': t.expected_value,
-                    'actual': t.actual_value,
-                    'passed': t.passed,
-                    'notes': t.notes
-                }
-                for t in test_results
-            ],
+            'summary': self.summarize(test_results, extraction_result),
+            'tests': [t.to_export_dict() for t in test_results],
             'failed_fields': [
                 t.field_name for t in test_results if not t.passed
             ]
         }
         
-        with open(output_file, 'w') as f:
-            json.dump(export_data, f, indent=2, default=str)
+        with open(output_file, 'wb') as f:
+            f.write(orjson.dumps(export_data, option=orjson.OPT_INDENT_2))
         
         print(f"\n📁 Results exported to: {output_file}")
+    
+    def export_results_ndjson(self, test_results: List[FieldTest], extraction_result: ExtractionResult,
+                              output_file: str = "test_results.ndjson"):
+        """
+        Export test results as NDJSON: a summary line, then one line per field.
+        
+        Lines are written as they are serialized, so large batches never
+        build the full tests list in memory.
+        """
+        with open(output_file, 'wb') as f:
+            f.write(orjson.dumps({'summary': self.summarize(test_results, extraction_result)}))
+            f.write(b"\n")
+            for t in test_results:
+                f.write(orjson.dumps(t.to_export_dict()))
+                f.write(b"\n")
+        
+        print(f"\n📁 Results exported to: {output_file}")
+
+
+def _extract_in_worker(pdf_path: str, use_cache: bool) -> ExtractionResult:
+    """Extract one PDF in a worker process (used by test_extraction_batch)"""
+    return K1ExtractionTester(verbose=False, use_cache=use_cache).extract_cached(pdf_path)
 
 
 def main():
     """
     Main test execution function.
     """
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="K-1 field extraction test")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Re-extract the PDF instead of reusing a cached result")
+    args = parser.parse_args()
+    
     # Initialize tester
-    tester = K1ExtractionTester(verbose=True)
+    tester = K1ExtractionTester(verbose=True, use_cache=not args.no_cache)
     
     # Test file path
     pdf_path = "Input/Input_Enviva_Sample_Tax_Package_10000_units-2.pdf"
@@ -403,7 +561,7 @@ def main():
     print(f"📄 Testing extraction on: {os.path.basename(pdf_path)}")
     
     # Run the test
-    test_results, extraction_result = tester.test_extraction(pdf_path)
+    test_results, extraction_result = tester.test_extraction(pdf_path, min_pass_rate=PASS_THRESHOLD)
     
     # Print results
     tester.print_results(test_results, extraction_result)
@@ -414,11 +572,12 @@ def main():
     # Return success/failure for CI/CD integration
     if test_results:
         pass_rate = sum(1 for t in test_results if t.passed) / len(test_results) * 100
-        if pass_rate >= 80:  # 80% pass rate threshold
+        if pass_rate >= PASS_THRESHOLD:
             print(f"\n✅ TEST PASSED: {pass_rate:.1f}% fields extracted correctly")
             return 0
         else:
-            print(f"\n❌ TEST FAILED: Only {pass_rate:.1f}% fields extracted correctly (need 80%)")
+            at_most = "at most " if not all(t.checked for t in test_results) else ""
+            print(f"\n❌ TEST FAILED: Only {at_most}{pass_rate:.1f}% fields extracted correctly (need {PASS_THRESHOLD}%)")
             return 1
     else:
         print("\n❌ TEST FAILED: No extraction results")
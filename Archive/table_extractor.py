@@ -11,12 +11,113 @@ Many K-1s format data in tables, especially:
 
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
+import functools
+import os
 import re
-import camelot
-import tabula
+import shutil
+import subprocess
 from pathlib import Path
 
+# Tables are serialized with these separators so one regex pass can scan
+# every row (ASCII unit/record separators never appear in PDF cell text)
+_CELL_SEP = '\x1f'
+_ROW_SEP = '\x1e'
+
+# "Box N" label (number in the same cell) followed by the first later cell in
+# the same row holding a digit
+_BOX_VALUE_RE = re.compile(
+    r'box[ \t]*(\d+[a-z]?)[^\x1f\x1e]*(?:\x1f[^\d\x1f\x1e]*)*?\x1f([^\x1f\x1e]*\d[^\x1f\x1e]*)',
+    re.IGNORECASE
+)
+
+# Identifier patterns
+_EIN_RE = re.compile(r'\d{2}-?\d{7}')
+_SSN_RE = re.compile(r'\d{3}-?\d{2}-?\d{4}')
+
+# Currency values; anchored on a leading digit so no digit pre-check is needed
+_CURRENCY_RE = re.compile(r'[\$\s]*(\d[\d,]*\.?\d*)\s*[\)\-]?')
+
+# Percentage values
+_PCT_RE = re.compile(r'([\d\.]+)\s*%')
+
+# ASCII digits, deleted via bytes.translate to test for any digit in one C call
+_DIGITS = bytes(range(0x30, 0x3A))
+
+# Box number -> our field names
+_BOX_FIELDS = {
+    '1': 'box_1_ordinary_income',
+    '2': 'box_2_rental_real_estate',
+    '3': 'box_3_other_rental',
+    '4': 'box_4_guaranteed_payments',
+    '5': 'box_5_interest_income',
+    '6a': 'box_6a_ordinary_dividends',
+    '6b': 'box_6b_qualified_dividends',
+    '7': 'box_7_royalties',
+    '8': 'box_8_net_short_term_gain',
+    '9a': 'box_9a_net_long_term_gain',
+    '11': 'box_11_other_income',
+    '12': 'box_12_section_179'
+}
+
+
+def _has_digit(text: str) -> bool:
+    """True if text contains an ASCII digit (single C-level scan, no per-char loop)."""
+    data = text.encode('ascii', 'ignore')
+    return data.translate(None, _DIGITS) != data
+
+
+def _pdftotext_pages(pdf_path: str) -> List[str]:
+    """Per-page text from poppler's pdftotext, or [] when it is unavailable or fails."""
+    if not shutil.which('pdftotext'):
+        return []
+    
+    try:
+        result = subprocess.run(
+            ['pdftotext', '-layout', pdf_path, '-'],
+            capture_output=True,
+            timeout=60
+        )
+    except (OSError, subprocess.SubprocessError):
+        return []
+    
+    if result.returncode != 0:
+        return []
+    
+    # pdftotext terminates every page with a form feed
+    return result.stdout.decode('utf-8', errors='replace').split('\f')[:-1]
+
+
+@functools.lru_cache(maxsize=4)
+def _read_camelot(pdf_path: str, mtime: float, pages: str, flavor: str):
+    """camelot.read_pdf memoized on (path, mtime, pages, flavor) so batch re-runs skip the parse."""
+    # Imported here: camelot pulls in Ghostscript and OpenCV at import time
+    import camelot
+    
+    return camelot.read_pdf(
+        pdf_path,
+        pages=pages,
+        flavor=flavor,
+        suppress_stdout=True
+    )
+
+
+@functools.lru_cache(maxsize=4)
+def _read_tabula(pdf_path: str, mtime: float, pages: str):
+    """tabula.read_pdf memoized on (path, mtime, pages); callers must not mutate the frames."""
+    # Imported here so the JVM lookup only happens when Tabula runs
+    import tabula
+    
+    return tabula.read_pdf(
+        pdf_path,
+        pages=pages,
+        multiple_tables=True,
+        pandas_options={'header': None},  # Don't assume first row is header
+        silent=True,
+        java_options=['-Xmx512m']
+    )
+
+
 class TableExtractor:
     """
     Extracts data from tables in K-1 PDFs.
@@ -28,6 +129,17 @@ class TableExtractor:
     4. Return structured data
     """
     
+    # Fields Camelot must find before the Tabula pass is considered redundant
+    REQUIRED_FIELDS = frozenset({
+        'ein',
+        'box_1_ordinary_income',
+        'capital_beginning',
+        'capital_ending'
+    })
+    
+    # Fewer ruling lines + rects than this on a page means a borderless layout
+    LATTICE_MIN_RULINGS = 10
+    
     def __init__(self, verbose: bool = False):
         self.verbose = verbose
         
@@ -76,26 +188,74 @@ class TableExtractor:
         """
         extracted_data = {}
         
+        # Point both engines at the pages that can hold K-1 tables
+        pages = self._find_table_pages(pdf_path)
+        self.log(f"Table pages: {pages}")
+        
         # Try Camelot first (better for bordered tables)
         self.log("Trying Camelot extraction...")
-        camelot_data = self._extract_with_camelot(pdf_path)
+        camelot_data = self._extract_with_camelot(pdf_path, pages)
         if camelot_data:
             extracted_data.update(camelot_data)
             self.log(f"Camelot extracted {len(camelot_data)} fields")
         
-        # Try Tabula as well (better for borderless tables)
-        self.log("Trying Tabula extraction...")
-        tabula_data = self._extract_with_tabula(pdf_path)
+        # Tabula costs a JVM start plus a full re-parse; only pay for it
+        # when Camelot left core fields missing
+        missing = self.REQUIRED_FIELDS - extracted_data.keys()
+        if not missing:
+            self.log("Camelot found all required fields, skipping Tabula")
+            return extracted_data
+        
+        self.log(f"Trying Tabula extraction for {len(missing)} missing fields...")
+        tabula_data = self._extract_with_tabula(pdf_path, pages)
+        
+        # Tabula fills the gaps (better for borderless tables)
         if tabula_data:
-            # Only add fields not already found by Camelot
-            for key, value in tabula_data.items():
-                if key not in extracted_data:
-                    extracted_data[key] = value
+            # Only add fields not already found by Camelot (right side wins)
+            extracted_data = {**tabula_data, **extracted_data}
             self.log(f"Tabula extracted {len(tabula_data)} additional fields")
         
         return extracted_data
     
-    def _extract_with_camelot(self, pdf_path: str) -> Dict:
+    def _find_table_pages(self, pdf_path: str) -> str:
+        """
+        Page selection for Camelot/Tabula: pages whose text mentions a K-1
+        table keyword, found with a single pdftotext call. Falls back to 'all'.
+        """
+        page_texts = _pdftotext_pages(pdf_path)
+        if not page_texts:
+            return 'all'
+        
+        keywords = [kw for group in self.k1_table_patterns.values() for kw in group]
+        pages = [
+            str(number)
+            for number, text in enumerate(map(str.lower, page_texts), start=1)
+            if any(kw in text for kw in keywords)
+        ]
+        
+        return ','.join(pages) if pages else 'all'
+    
+    def _choose_camelot_flavor(self, pdf_path: str, pages: str) -> Optional[str]:
+        """
+        Pick Camelot's flavor from the ruling lines on the first table page:
+        'lattice' for bordered layouts, 'stream' for borderless ones.
+        Returns None when the page can't be inspected.
+        """
+        first_page = 1 if pages == 'all' else int(pages.split(',')[0])
+        
+        try:
+            import pdfplumber
+            
+            with pdfplumber.open(pdf_path, pages=[first_page]) as pdf:
+                page = pdf.pages[0]
+                rulings = len(page.lines) + len(page.rects)
+        except Exception as e:
+            self.log(f"Ruling-line check failed: {e}")
+            return None
+        
+        return 'lattice' if rulings >= self.LATTICE_MIN_RULINGS else 'stream'
+    
+    def _extract_with_camelot(self, pdf_path: str, pages: str = 'all') -> Dict:
         """
         Extract tables using Camelot.
         
@@ -107,22 +267,20 @@ class TableExtractor:
         extracted_data = {}
         
         try:
-            # Read tables from all pages
-            tables = camelot.read_pdf(
-                pdf_path,
-                pages='all',
-                flavor='lattice',  # For bordered tables
-                suppress_stdout=True
-            )
+            # Read tables from the selected pages
+            mtime = os.path.getmtime(pdf_path)
+            flavor = self._choose_camelot_flavor(pdf_path, pages)
             
-            if len(tables) == 0:
-                # Try stream flavor for borderless tables
-                tables = camelot.read_pdf(
-                    pdf_path,
-                    pages='all',
-                    flavor='stream',
-                    suppress_stdout=True
-                )
+            if flavor:
+                # One pass with the flavor that fits the page layout
+                self.log(f"Using Camelot {flavor} flavor")
+                tables = _read_camelot(pdf_path, mtime, pages, flavor)
+            else:
+                tables = _read_camelot(pdf_path, mtime, pages, 'lattice')  # For bordered tables
+                
+                if len(tables) == 0:
+                    # Try stream flavor for borderless tables
+                    tables = _read_camelot(pdf_path, mtime, pages, 'stream')
             
             self.log(f"Found {len(tables)} tables with Camelot")
             
@@ -140,7 +298,7 @@ class TableExtractor:
         
         return extracted_data
     
-    def _extract_with_tabula(self, pdf_path: str) -> Dict:
+    def _extract_with_tabula(self, pdf_path: str, pages: str = 'all') -> Dict:
         """
         Extract tables using Tabula.
         
@@ -152,14 +310,8 @@ class TableExtractor:
         extracted_data = {}
         
         try:
-            # Read all tables from the PDF
-            dfs = tabula.read_pdf(
-                pdf_path,
-                pages='all',
-                multiple_tables=True,
-                pandas_options={'header': None},  # Don't assume first row is header
-                silent=True
-            )
+            # Read all tables from the selected pages
+            dfs = _read_tabula(pdf_path, os.path.getmtime(pdf_path), pages)
             
             self.log(f"Found {len(dfs)} tables with Tabula")
             
@@ -188,6 +340,10 @@ class TableExtractor:
         2. Look for specific K-1 patterns
         3. Handle capital account tables
         4. Handle income/deduction tables with box numbers
+        
+        Box values come from one regex scan over the serialized table; the
+        other strategies share a single pass over the rows, where each row's
+        text is joined and lowercased once and handed to every matcher.
         """
         extracted_data = {}
         
@@ -197,25 +353,27 @@ class TableExtractor:
         if df.empty:
             return extracted_data
         
-        # Strategy 1: Look for capital account table
-        capital_data = self._extract_capital_account(df)
-        if capital_data:
-            extracted_data.update(capital_data)
-        
-        # Strategy 2: Look for income boxes (Box 1, Box 2, etc.)
-        box_data = self._extract_box_values(df)
-        if box_data:
-            extracted_data.update(box_data)
+        # Strategy 2: Look for income boxes (Box 1, Box 2, etc.) in one
+        # regex scan over the whole table
+        extracted_data.update(self._extract_box_values(df))
         
-        # Strategy 3: Look for percentages
-        percentage_data = self._extract_percentages(df)
-        if percentage_data:
-            extracted_data.update(percentage_data)
+        # Capital account rows only count in tables that look like one
+        is_capital_table = self._is_capital_account_table(df)
         
-        # Strategy 4: Look for EIN/SSN
-        id_data = self._extract_identifiers(df)
-        if id_data:
-            extracted_data.update(id_data)
+        # Plain tuples: iterrows() would build a pd.Series for every row
+        for row in df.itertuples(index=False, name=None):
+            row_text = ' '.join(str(cell) for cell in row)
+            row_lower = row_text.lower()
+            
+            # Strategy 1: Look for capital account table
+            if is_capital_table:
+                self._match_capital_account(row, row_lower, extracted_data)
+            
+            # Strategy 3: Look for percentages
+            self._match_percentage(row, row_lower, extracted_data)
+            
+            # Strategy 4: Look for EIN/SSN
+            self._match_identifiers(row_text, row_lower, extracted_data)
         
         return extracted_data
     
@@ -226,187 +384,141 @@ class TableExtractor:
         
         # Convert all cells to string
         df = df.astype(str)
-        
-        # Replace 'nan' strings with empty strings
-        df = df.replace('nan', '')
-        
-        # Strip whitespace
-        df = df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
-        
+
+        # Strip whitespace and blank out 'nan' strings in one vectorized
+        # pass per column (applymap called a Python lambda per cell)
+        df = df.apply(lambda col: col.str.strip().replace({'nan': ''}))
+
         return df
     
-    def _extract_capital_account(self, df: pd.DataFrame) -> Dict:
-        """Extract capital account information from table."""
-        extracted = {}
-        
-        # Convert dataframe to string for pattern matching
-        table_text = df.to_string().lower()
-        
-        # Check if this looks like a capital account table
-        if 'capital' not in table_text and 'beginning' not in table_text:
-            return extracted
-        
-        # Look through each row
-        for idx, row in df.iterrows():
-            row_text = ' '.join(str(cell).lower() for cell in row)
-            
-            # Beginning capital
-            if 'beginning' in row_text and 'capital' in row_text:
-                value = self._extract_currency_from_row(row)
-                if value:
-                    extracted['capital_beginning'] = value
-            
-            # Ending capital
-            elif 'ending' in row_text and 'capital' in row_text:
-                value = self._extract_currency_from_row(row)
-                if value:
-                    extracted['capital_ending'] = value
-            
-            # Contributions
-            elif 'contribut' in row_text:
-                value = self._extract_currency_from_row(row)
-                if value:
-                    extracted['capital_contributions'] = value
-            
-            # Distributions
-            elif 'distribution' in row_text or 'withdrawal' in row_text:
-                value = self._extract_currency_from_row(row)
-                if value:
-                    extracted['capital_distributions'] = value
+    def _is_capital_account_table(self, df: pd.DataFrame) -> bool:
+        """Check if this looks like a capital account table."""
+        # Join the (already stringified) cells for pattern matching;
+        # to_string() would pad and align the whole frame just for this
+        table_text = ' '.join(df.to_numpy().ravel()).lower()
         
-        return extracted
+        return 'capital' in table_text or 'beginning' in table_text
+    
+    def _match_capital_account(self, row: Tuple, row_lower: str, extracted: Dict):
+        """Extract capital account information from a table row."""
+        # Beginning capital
+        if 'beginning' in row_lower and 'capital' in row_lower:
+            value = self._extract_currency_from_row(row)
+            if value:
+                extracted['capital_beginning'] = value
+        
+        # Ending capital
+        elif 'ending' in row_lower and 'capital' in row_lower:
+            value = self._extract_currency_from_row(row)
+            if value:
+                extracted['capital_ending'] = value
+        
+        # Contributions
+        elif 'contribut' in row_lower:
+            value = self._extract_currency_from_row(row)
+            if value:
+                extracted['capital_contributions'] = value
+        
+        # Distributions
+        elif 'distribution' in row_lower or 'withdrawal' in row_lower:
+            value = self._extract_currency_from_row(row)
+            if value:
+                extracted['capital_distributions'] = value
     
     def _extract_box_values(self, df: pd.DataFrame) -> Dict:
         """Extract values for numbered boxes (Box 1, Box 2, etc.)."""
         extracted = {}
         
-        # Pattern for box numbers
-        box_pattern = re.compile(r'box\s*(\d+[a-z]?)', re.IGNORECASE)
+        table_text = _ROW_SEP.join(
+            _CELL_SEP.join(row) for row in df.itertuples(index=False, name=None)
+        )
         
-        for idx, row in df.iterrows():
-            row_text = ' '.join(str(cell) for cell in row)
+        # Pair each box label with the first numeric cell after it
+        for match in _BOX_VALUE_RE.finditer(table_text):
+            field_name = _BOX_FIELDS.get(match.group(1).lower())
+            if field_name is None:
+                continue
             
-            # Look for box numbers
-            match = box_pattern.search(row_text)
-            if match:
-                box_num = match.group(1).lower()
-                value = self._extract_currency_from_row(row)
-                
-                if value is not None:
-                    # Map to our field names
-                    field_map = {
-                        '1': 'box_1_ordinary_income',
-                        '2': 'box_2_rental_real_estate',
-                        '3': 'box_3_other_rental',
-                        '4': 'box_4_guaranteed_payments',
-                        '5': 'box_5_interest_income',
-                        '6a': 'box_6a_ordinary_dividends',
-                        '6b': 'box_6b_qualified_dividends',
-                        '7': 'box_7_royalties',
-                        '8': 'box_8_net_short_term_gain',
-                        '9a': 'box_9a_net_long_term_gain',
-                        '11': 'box_11_other_income',
-                        '12': 'box_12_section_179'
-                    }
-                    
-                    if box_num in field_map:
-                        extracted[field_map[box_num]] = value
+            value = self._extract_currency_from_row((match.group(2),))
+            if value is not None:
+                extracted[field_name] = value
         
         return extracted
     
-    def _extract_percentages(self, df: pd.DataFrame) -> Dict:
-        """Extract ownership percentages from table."""
-        extracted = {}
-        
-        for idx, row in df.iterrows():
-            row_text = ' '.join(str(cell).lower() for cell in row)
-            
-            # Profit percentage
-            if 'profit' in row_text and '%' in row_text:
-                value = self._extract_percentage_from_row(row)
-                if value:
-                    extracted['profit_sharing_percent'] = value
-            
-            # Loss percentage
-            elif 'loss' in row_text and '%' in row_text:
-                value = self._extract_percentage_from_row(row)
-                if value:
-                    extracted['loss_sharing_percent'] = value
-            
-            # Capital percentage
-            elif 'capital' in row_text and '%' in row_text:
-                value = self._extract_percentage_from_row(row)
-                if value:
-                    extracted['capital_percent'] = value
-        
-        return extracted
+    def _match_percentage(self, row: Tuple, row_lower: str, extracted: Dict):
+        """Extract ownership percentages from a table row."""
+        if '%' not in row_lower:
+            return
+        
+        # Profit percentage
+        if 'profit' in row_lower:
+            value = self._extract_percentage_from_row(row)
+            if value:
+                extracted['profit_sharing_percent'] = value
+        
+        # Loss percentage
+        elif 'loss' in row_lower:
+            value = self._extract_percentage_from_row(row)
+            if value:
+                extracted['loss_sharing_percent'] = value
+        
+        # Capital percentage
+        elif 'capital' in row_lower:
+            value = self._extract_percentage_from_row(row)
+            if value:
+                extracted['capital_percent'] = value
     
-    def _extract_identifiers(self, df: pd.DataFrame) -> Dict:
-        """Extract EIN, SSN, and other identifiers from table."""
-        extracted = {}
+    def _match_identifiers(self, row_text: str, row_lower: str, extracted: Dict):
+        """Extract EIN, SSN, and other identifiers from a table row."""
+        # Look for EIN
+        if 'ein' in row_lower or 'employer' in row_lower:
+            ein_match = _EIN_RE.search(row_text)
+            if ein_match:
+                extracted['ein'] = ein_match.group()
+        
+        # Look for SSN
+        if 'ssn' in row_lower or 'social' in row_lower:
+            ssn_match = _SSN_RE.search(row_text)
+            if ssn_match:
+                extracted['partner_ssn'] = ssn_match.group()
+    
+    def _extract_currency_from_row(self, row: Iterable) -> Optional[float]:
+        """Extract currency value from a table row (first cell holding an amount)."""
+        cells = [str(cell) for cell in row]
         
-        # EIN pattern
-        ein_pattern = re.compile(r'\d{2}-?\d{7}')
+        # Most rows are labels or blanks; skip building a Series for them
+        if not _has_digit(''.join(cells)):
+            return None
         
-        # SSN pattern
-        ssn_pattern = re.compile(r'\d{3}-?\d{2}-?\d{4}')
+        cells = pd.Series(cells, dtype=object)
         
-        for idx, row in df.iterrows():
-            row_text = ' '.join(str(cell) for cell in row)
-            
-            # Look for EIN
-            if 'ein' in row_text.lower() or 'employer' in row_text.lower():
-                ein_match = ein_pattern.search(row_text)
-                if ein_match:
-                    extracted['ein'] = ein_match.group()
-            
-            # Look for SSN
-            if 'ssn' in row_text.lower() or 'social' in row_text.lower():
-                ssn_match = ssn_pattern.search(row_text)
-                if ssn_match:
-                    extracted['partner_ssn'] = ssn_match.group()
+        # Pull the amount out of every cell at once, then parse as numbers;
+        # cells without a parsable amount become NaN
+        amounts = cells.str.extract(_CURRENCY_RE, expand=False)
+        values = pd.to_numeric(amounts.str.replace(',', '', regex=False), errors='coerce')
         
-        return extracted
-    
-    def _extract_currency_from_row(self, row: pd.Series) -> Optional[float]:
-        """Extract currency value from a table row."""
-        # Pattern for currency values
-        currency_pattern = re.compile(r'[\$\s]*([\d,]+\.?\d*)\s*[\)\-]?')
+        found = np.flatnonzero(values.notna().to_numpy())
+        if len(found) == 0:
+            return None
         
-        # Check each cell in the row
-        for cell in row:
-            cell_str = str(cell)
-            
-            # Skip if not numeric-looking
-            if not any(char.isdigit() for char in cell_str):
-                continue
-            
-            # Try to extract currency
-            match = currency_pattern.search(cell_str)
-            if match:
-                try:
-                    # Clean and convert to float
-                    value_str = match.group(1).replace(',', '')
-                    value = float(value_str)
-                    
-                    # Check for negative (parentheses or trailing dash)
-                    if '(' in cell_str or cell_str.strip().endswith('-'):
-                        value = -value
-                    
-                    return value
-                except ValueError:
-                    continue
+        first = found[0]
+        value = float(values.iloc[first])
         
-        return None
+        # Check for negative (parentheses or trailing dash)
+        cell_str = cells.iloc[first]
+        if '(' in cell_str or cell_str.strip().endswith('-'):
+            value = -value
+        
+        return value
     
-    def _extract_percentage_from_row(self, row: pd.Series) -> Optional[float]:
+    def _extract_percentage_from_row(self, row: Iterable) -> Optional[float]:
         """Extract percentage value from a table row."""
-        # Pattern for percentage values
-        percentage_pattern = re.compile(r'([\d\.]+)\s*%')
-        
         for cell in row:
             cell_str = str(cell)
-            match = percentage_pattern.search(cell_str)
+            if '%' not in cell_str:
+                continue
+            
+            match = _PCT_RE.search(cell_str)
             if match:
                 try:
                     return float(match.group(1))
@@ -12,19 +12,27 @@ Features:
 """
 
 import streamlit as st
-import pandas as pd
 import json
 import time
+import functools
 from datetime import datetime
 import os
+import hashlib
+import pickle
 import tempfile
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
 
 # Our modules
 from models import K1Data, ExtractionResult, FormType
-from extractor import K1Extractor
 from patterns import K1Patterns
 
+# pandas and the extractor (PDF libraries) are imported where first used to
+# keep them off the cold-start path
+if TYPE_CHECKING:
+    import pandas as pd
+
 # Page config
 st.set_page_config(
     page_title="K-1 Reader - Smart Tax Form Extraction",
@@ -33,85 +41,152 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS for better styling
-st.markdown("""
-<style>
-    /* Main header styling */
-    .main-header {
-        font-size: 2.5rem;
-        font-weight: bold;
-        background: linear-gradient(90deg, #1e3c72 0%, #2a5298 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        text-align: center;
-        padding: 1rem 0;
-    }
-    
-    /* Success/Error boxes */
-    .success-box {
-        padding: 1rem;
-        border-radius: 0.5rem;
-        background-color: #d4edda;
-        border: 1px solid #c3e6cb;
-        color: #155724;
-    }
-    
-    .error-box {
-        padding: 1rem;
-        border-radius: 0.5rem;
-        background-color: #f8d7da;
-        border: 1px solid #f5c6cb;
-        color: #721c24;
-    }
-    
-    /* Metric cards */
-    .metric-card {
-        background: white;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        text-align: center;
-    }
-    
-    /* Confidence indicator colors */
-    .high-confidence { color: #28a745; font-weight: bold; }
-    .medium-confidence { color: #ffc107; font-weight: bold; }
-    .low-confidence { color: #dc3545; font-weight: bold; }
-</style>
-""", unsafe_allow_html=True)
+# Custom CSS for better styling, read from static/app.css once per server process
+@st.cache_resource
+def load_css() -> str:
+    """Stylesheet wrapped in a <style> tag, ready for st.markdown."""
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "app.css")) as f:
+        return f"<style>\n{f.read()}</style>"
+
+st.markdown(load_css(), unsafe_allow_html=True)
 
 # Initialize session state
-if 'extraction_history' not in st.session_state:
-    st.session_state.extraction_history = []
-if 'current_result' not in st.session_state:
-    st.session_state.current_result = None
+if 'current_data' not in st.session_state:
+    # Extracted K1Fields, its field dict (built once per extraction) and run metadata
+    st.session_state.current_data = None
+    st.session_state.current_data_dict = None
+    st.session_state.current_meta = None
+if 'extraction_future' not in st.session_state:
+    st.session_state.extraction_future = None
+    st.session_state.extraction_job = None
 
 # Cache the extractor
 @st.cache_resource
 def get_extractor():
     """Initialize and cache the K1 extractor."""
+    from extractor import K1Extractor
     return K1Extractor(verbose=True)
 
+@st.cache_resource
+def get_executor():
+    """Shared worker pool that runs extractions off the script thread."""
+    return ThreadPoolExecutor(max_workers=max(1, (os.cpu_count() or 2) - 1))
+
+# Extraction results are pickled here, keyed by the SHA-256 of the PDF bytes
+# plus the extractor's schema fingerprint
+CACHE_DIR = ".cache"
+CACHE_TTL = 24 * 3600  # seconds
+MAX_CACHE_ENTRIES = 200
+
+@functools.lru_cache(maxsize=None)
+def cache_schema() -> str:
+    """Fingerprint of EXTRACTOR_VERSION and the K1Fields field names."""
+    from extractor import EXTRACTOR_VERSION, K1Fields
+    layout = f"{EXTRACTOR_VERSION}:{','.join(K1Fields.__dataclass_fields__)}"
+    return hashlib.sha256(layout.encode()).hexdigest()[:16]
+
+def prune_cache() -> None:
+    """
+    Delete cache files older than CACHE_TTL, then the oldest writes beyond
+    MAX_CACHE_ENTRIES. The files hold partner TINs, names and addresses, so
+    nothing is kept past its TTL.
+    """
+    now = time.time()
+    entries = []
+    with os.scandir(CACHE_DIR) as it:
+        for entry in it:
+            try:
+                mtime = entry.stat().st_mtime
+                if now - mtime >= CACHE_TTL:
+                    os.remove(entry.path)
+                elif entry.name.endswith(".pkl"):
+                    entries.append((mtime, entry.path))
+            except OSError:
+                # Removed by a concurrent prune
+                pass
+    
+    entries.sort()
+    for _, path in entries[:-MAX_CACHE_ENTRIES]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def extract_cached(extractor, pdf_bytes: bytes, filename: str, key: str):
+    """
+    Run extract_from_bytes, reusing the pickled result for identical PDF bytes
+    if it is younger than CACHE_TTL.
+    """
+    from extractor import K1Fields
+    
+    # Results from another extractor version or K1Fields layout get a
+    # different file name and are never loaded (a slots dataclass would
+    # unpickle with new fields unset)
+    cache_file = os.path.join(CACHE_DIR, f"{key}-{cache_schema()}.pkl")
+    try:
+        if time.time() - os.path.getmtime(cache_file) < CACHE_TTL:
+            with open(cache_file, 'rb') as f:
+                result = pickle.load(f)
+            if isinstance(result, K1Fields):
+                return result
+    except Exception:
+        # Missing or corrupt: extract afresh
+        pass
+    
+    result = extractor.extract_from_bytes(pdf_bytes, filename)
+    
+    # Write a uniquely named temp file then rename, so concurrent sessions
+    # never read a partial file or race on the same temp name. The cache is
+    # only an optimization: a failed write still returns the result.
+    tmp_file = None
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, tmp_file = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(result, f)
+        os.replace(tmp_file, cache_file)
+        tmp_file = None
+        prune_cache()
+    except Exception:
+        if tmp_file is not None:
+            try:
+                os.remove(tmp_file)
+            except OSError:
+                pass
+    
+    return result
+
+# Confidence buckets: below 0.6 is low, 0.6 up to 0.8 medium, 0.8 and above high.
+# np.searchsorted(..., side='right') maps scores (scalar or array) to bucket indices
+CONFIDENCE_THRESHOLDS = np.array([0.6, 0.8])
+CONFIDENCE_COLORS = np.array(["🔴", "🟡", "🟢"])  # Red, Yellow, Green
+CONFIDENCE_CLASSES = np.array(["low-confidence", "medium-confidence", "high-confidence"])
+
+def confidence_buckets(confidences):
+    """Bucket index (0 low, 1 medium, 2 high) for each confidence score."""
+    return np.searchsorted(CONFIDENCE_THRESHOLDS, confidences, side='right')
+
+# The display helpers below are pure and run for every field on every rerun,
+# so their results are memoized
+@functools.lru_cache(maxsize=4096)
 def get_confidence_color(confidence: float) -> str:
     """Get color based on confidence score."""
-    if confidence >= 0.8:
-        return "🟢"  # Green
-    elif confidence >= 0.6:
-        return "🟡"  # Yellow
-    else:
-        return "🔴"  # Red
+    return str(CONFIDENCE_COLORS[confidence_buckets(confidence)])
 
+@functools.lru_cache(maxsize=4096)
 def get_confidence_class(confidence: float) -> str:
     """Get CSS class based on confidence score."""
-    if confidence >= 0.8:
-        return "high-confidence"
-    elif confidence >= 0.6:
-        return "medium-confidence"
-    else:
-        return "low-confidence"
+    return str(CONFIDENCE_CLASSES[confidence_buckets(confidence)])
 
 def format_currency(value: Optional[float]) -> str:
     """Format number as currency."""
+    # Quantize to cents so near-identical floats share a cache entry
+    if isinstance(value, float):
+        value = round(value, 2)
+    return _format_currency(value)
+
+@functools.lru_cache(maxsize=4096)
+def _format_currency(value: Optional[float]) -> str:
     if value is None:
         return "—"
     
@@ -130,10 +205,153 @@ def format_currency(value: Optional[float]) -> str:
 
 def format_percentage(value: Optional[float]) -> str:
     """Format number as percentage."""
+    if isinstance(value, float):
+        value = round(value, 2)
+    return _format_percentage(value)
+
+@functools.lru_cache(maxsize=4096)
+def _format_percentage(value: Optional[float]) -> str:
     if value is None:
         return "—"
     return f"{value:.2f}%"
 
+# Part III boxes summed into the Results tab's total income
+INCOME_TOTAL_FIELDS = (
+    'part_iii_1_ordinary_income',
+    'part_iii_2_rental_real_estate',
+    'part_iii_3_other_rental',
+    'part_iii_4a_guaranteed_payments_services',
+    'part_iii_4b_guaranteed_payments_capital',
+    'part_iii_4c_total_guaranteed_payments',
+    'part_iii_5_interest_income',
+    'part_iii_6a_ordinary_dividends',
+    'part_iii_6b_qualified_dividends',
+    'part_iii_6c_dividend_equivalents',
+    'part_iii_7_royalties',
+    'part_iii_8_net_short_term_gain',
+    'part_iii_9a_net_long_term_gain',
+    'part_iii_9b_collectibles_gain',
+    'part_iii_9c_unrecaptured_1250',
+    'part_iii_10_net_section_1231',
+)
+
+def income_total(data) -> float:
+    """Sum of the numeric Part III income boxes."""
+    values = (getattr(data, name) for name in INCOME_TOTAL_FIELDS)
+    return sum(v for v in values if isinstance(v, (int, float)))
+
+def capital_reconciliation(data) -> Dict:
+    """
+    Item L capital account components, the ending capital they imply and
+    its difference from the reported ending capital.
+    """
+    beginning = data.part_ii_l_beginning_capital or 0
+    contributed = data.part_ii_l_capital_contributed or 0
+    income = data.part_ii_l_current_year_income or 0
+    other_increase = data.part_ii_l_other_increase or 0
+    distributions = data.part_ii_l_withdrawals_distributions or 0
+    ending = data.part_ii_l_ending_capital or 0
+    
+    # Convert string values to float if needed
+    if isinstance(other_increase, str):
+        try:
+            other_increase = float(other_increase)
+        except ValueError:
+            other_increase = 0
+    
+    calculated = beginning + contributed + income + other_increase - distributions
+    difference = ending - calculated
+    
+    return {
+        'beginning': beginning,
+        'contributed': contributed,
+        'income': income,
+        'other_increase': other_increase,
+        'distributions': distributions,
+        'ending': ending,
+        'calculated': calculated,
+        'difference': difference,
+        'reconciles': abs(difference) < 1.0
+    }
+
+@st.cache_data
+def build_exports(data_dict: Dict) -> Tuple[str, str]:
+    """JSON and vertical (Field, Value) CSV export payloads for one extraction."""
+    import pandas as pd
+    json_data = json.dumps(data_dict, indent=2, default=str)
+    
+    # Add all non-None fields to the CSV, keeping numbers numeric
+    csv_data_dict = {'Field': [], 'Value': []}
+    for field_name, field_value in data_dict.items():
+        if field_value is not None:
+            csv_data_dict['Field'].append(field_name)
+            if isinstance(field_value, (int, float)):
+                csv_data_dict['Value'].append(field_value)
+            else:
+                csv_data_dict['Value'].append(str(field_value))
+    csv_data = pd.DataFrame(csv_data_dict).to_csv(index=False)
+    
+    return json_data, csv_data
+
+def show_fields(fields: Dict[str, str]) -> None:
+    """Render label/value pairs as one read-only table."""
+    import pandas as pd
+    st.dataframe(
+        pd.DataFrame({"Field": list(fields), "Value": list(fields.values())}),
+        hide_index=True,
+        use_container_width=True
+    )
+
+# Tab 3 income chart categories, in the order their values are collected
+INCOME_CATEGORIES = np.array(["Ordinary Income", "Rental Income", "Interest", "Dividends"])
+
+# Columns shown in the History tab
+HISTORY_COLUMNS = ["Timestamp", "Filename", "Status", "Confidence", "Error"]
+
+# Only the most recent extractions are kept for the History tab; the
+# statistics use running totals over every extraction in the session
+MAX_HISTORY = 100
+
+def empty_history_df() -> "pd.DataFrame":
+    """Empty history table with a fixed column schema."""
+    import pandas as pd
+    return pd.DataFrame({col: pd.Series(dtype="object") for col in HISTORY_COLUMNS})
+
+def reset_history() -> None:
+    """Clear the history list, its table and the running totals."""
+    st.session_state.extraction_history = []
+    st.session_state.history_df = None  # Created by record_history() on the first extraction
+    st.session_state.hist_count = 0
+    st.session_state.hist_success_count = 0
+    st.session_state.hist_conf_sum = 0.0
+
+def record_history(entry: Dict) -> None:
+    """Add an extraction to the running totals, the history list and the history table."""
+    confidence = entry.get('confidence')
+    st.session_state.hist_count += 1
+    st.session_state.hist_success_count += bool(entry['success'])
+    st.session_state.hist_conf_sum += confidence or 0.0
+    
+    history = st.session_state.extraction_history
+    history.append(entry)
+    del history[:-MAX_HISTORY]
+    
+    if st.session_state.history_df is None:
+        st.session_state.history_df = empty_history_df()
+    history_df = st.session_state.history_df
+    history_df.loc[len(history_df)] = (
+        entry['timestamp'].strftime("%Y-%m-%d %H:%M:%S"),
+        entry['filename'],
+        "✅ Success" if entry['success'] else "❌ Failed",
+        f"{confidence:.0%}" if confidence else "—",
+        entry.get('error', '—'),
+    )
+    if len(history_df) > MAX_HISTORY:
+        st.session_state.history_df = history_df.iloc[-MAX_HISTORY:].reset_index(drop=True)
+
+if 'hist_count' not in st.session_state:
+    reset_history()
+
 # ============================================================================
 # HEADER
 # ============================================================================
@@ -154,16 +372,13 @@ with st.sidebar:
     st.header("📊 Dashboard")
     
     # Statistics
-    if st.session_state.extraction_history:
-        st.metric("Total Processed", len(st.session_state.extraction_history))
+    if st.session_state.hist_count:
+        st.metric("Total Processed", st.session_state.hist_count)
         
-        successful = sum(1 for r in st.session_state.extraction_history if r['success'])
-        success_rate = (successful / len(st.session_state.extraction_history)) * 100
+        success_rate = st.session_state.hist_success_count / st.session_state.hist_count * 100
         st.metric("Success Rate", f"{success_rate:.0f}%")
         
-        avg_confidence = sum(
-            r.get('confidence', 0) for r in st.session_state.extraction_history if r.get('confidence')
-        ) / len(st.session_state.extraction_history)
+        avg_confidence = st.session_state.hist_conf_sum / st.session_state.hist_count
         st.metric("Avg Confidence", f"{avg_confidence:.0%}")
     else:
         st.info("No documents processed yet")
@@ -197,8 +412,10 @@ with st.sidebar:
     
     # Clear history button
     if st.button("🗑️ Clear History", use_container_width=True):
-        st.session_state.extraction_history = []
-        st.session_state.current_result = None
+        reset_history()
+        st.session_state.current_data = None
+        st.session_state.current_data_dict = None
+        st.session_state.current_meta = None
         st.rerun()
 
 # ============================================================================
@@ -238,10 +455,24 @@ with tab1:
             
             # Process button
             if st.button("🚀 Extract Data", type="primary", use_container_width=True):
-                # Save uploaded file to temp location
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-                    tmp_file.write(uploaded_file.getbuffer())
-                    tmp_path = tmp_file.name
+                # The uploader already holds the file in memory; extract from it directly
+                pdf_bytes = uploaded_file.getvalue()
+                cache_key = hashlib.sha256(pdf_bytes).hexdigest()
+                
+                # Hand the extraction to the worker pool; the future lives in
+                # session state so a rerun polls it instead of resubmitting
+                extractor = get_extractor()
+                st.session_state.extraction_future = get_executor().submit(
+                    extract_cached, extractor, pdf_bytes, uploaded_file.name, cache_key
+                )
+                st.session_state.extraction_job = {
+                    'filename': uploaded_file.name,
+                    'started': time.perf_counter()
+                }
+            
+            if st.session_state.extraction_future is not None:
+                future = st.session_state.extraction_future
+                job = st.session_state.extraction_job
                 
                 # Show progress
                 progress_container = st.container()
@@ -249,78 +480,83 @@ with tab1:
                     progress_bar = st.progress(0)
                     status_text = st.empty()
                     
-                    # Step 1: Initialize
-                    status_text.text("🔄 Initializing extractor...")
-                    progress_bar.progress(20)
-                    extractor = get_extractor()
-                    
-                    # Step 2: Extract
-                    status_text.text("📄 Reading PDF...")
-                    progress_bar.progress(40)
-                    time.sleep(0.5)  # Visual feedback
-                    
+                    # Poll the running extraction
                     status_text.text("🔍 Extracting data...")
-                    progress_bar.progress(60)
-                    
-                    # Perform extraction
-                    k1_data = extractor.extract_from_pdf(tmp_path)
-                    
-                    # Step 3: Process results
-                    status_text.text("✨ Processing results...")
-                    progress_bar.progress(80)
-                    time.sleep(0.3)
-                    
-                    # Step 4: Complete
-                    progress_bar.progress(100)
-                    
-                    # Check if extraction was successful (count populated fields)
-                    populated_fields = len([k for k, v in k1_data.__dict__.items() if v is not None and not k.startswith('_')])
+                    progress = 20
+                    while not future.done():
+                        progress = min(95, progress + 5)
+                        progress_bar.progress(progress)
+                        time.sleep(0.1)
                     
-                    if populated_fields > 0:
-                        status_text.text("✅ Extraction complete!")
-                        st.balloons()
-                        
-                        # Create a mock result object for compatibility
-                        class MockResult:
-                            def __init__(self, k1_data):
-                                self.success = True
-                                self.data = k1_data
-                                self.processing_time = 1.0
-                                
-                        mock_result = MockResult(k1_data)
-                        
-                        # Store result
-                        st.session_state.current_result = mock_result
-                        st.session_state.extraction_history.append({
+                    st.session_state.extraction_future = None
+                    st.session_state.extraction_job = None
+                    try:
+                        k1_data = future.result()
+                    except Exception as e:
+                        # e.g. the result cache directory isn't writable
+                        status_text.text("❌ Extraction failed")
+                        st.error(f"Extraction failed: {e}")
+                        record_history({
                             'timestamp': datetime.now(),
-                            'filename': uploaded_file.name,
-                            'success': True,
-                            'confidence': 0.9,  # Default confidence
-                            'data': k1_data.__dict__
+                            'filename': job['filename'],
+                            'success': False,
+                            'error': str(e)
                         })
+                        k1_data = None
+                    
+                    if k1_data is not None:
+                        processing_time = time.perf_counter() - job['started']
                         
-                        # Show success message
-                        st.success(
-                            f"Successfully extracted {populated_fields} fields!"
-                        )
+                        status_text.text("✨ Processing results...")
+                        progress_bar.progress(100)
                         
-                        # Auto-switch to results tab
-                        st.info("👉 Check the **Results** tab to review extracted data")
+                        # Build the field dict once; the tabs and exports all read from it
+                        data_dict = {name: getattr(k1_data, name) for name in k1_data.__dataclass_fields__}
                         
-                    else:
-                        status_text.text("❌ Extraction failed")
-                        st.error("No fields were extracted from the PDF")
+                        # Check if extraction was successful (count populated fields)
+                        populated_fields = sum(1 for v in data_dict.values() if v is not None)
                         
-                        # Store failed attempt
-                        st.session_state.extraction_history.append({
-                            'timestamp': datetime.now(),
-                            'filename': uploaded_file.name,
-                            'success': False,
-                            'error': "No fields extracted"
-                        })
-                
-                # Clean up temp file
-                os.unlink(tmp_path)
+                        if populated_fields > 0:
+                            status_text.text("✅ Extraction complete!")
+                            st.balloons()
+                            
+                            # Store result
+                            st.session_state.current_data = k1_data
+                            st.session_state.current_data_dict = data_dict
+                            st.session_state.current_meta = {
+                                'success': True,
+                                'processing_time': processing_time,
+                                'total_income': income_total(k1_data),
+                                'capital': capital_reconciliation(k1_data)
+                            }
+                            # History keeps only primitives, not the extracted fields
+                            record_history({
+                                'timestamp': datetime.now(),
+                                'filename': job['filename'],
+                                'success': True,
+                                'confidence': 0.9,  # Default confidence
+                                'fields': populated_fields
+                            })
+                            
+                            # Show success message
+                            st.success(
+                                f"Successfully extracted {populated_fields} fields!"
+                            )
+                            
+                            # Auto-switch to results tab
+                            st.info("👉 Check the **Results** tab to review extracted data")
+                        
+                        else:
+                            status_text.text("❌ Extraction failed")
+                            st.error("No fields were extracted from the PDF")
+                            
+                            # Store failed attempt
+                            record_history({
+                                'timestamp': datetime.now(),
+                                'filename': job['filename'],
+                                'success': False,
+                                'error': "No fields extracted"
+                            })
         
         else:
             # Show demo info when no file uploaded
@@ -339,10 +575,13 @@ with tab1:
 # TAB 2: RESULTS
 # ============================================================================
 
-with tab2:
-    if st.session_state.current_result and st.session_state.current_result.success:
-        result = st.session_state.current_result
-        data = result.data
+@st.fragment
+def render_results_tab(show_raw_text: bool) -> None:
+    """Results tab: extracted fields, capital reconciliation and exports."""
+    if st.session_state.current_meta and st.session_state.current_meta['success']:
+        meta = st.session_state.current_meta
+        data = st.session_state.current_data
+        data_dict = st.session_state.current_data_dict
         
         # Header with key metrics
         col1, col2, col3, col4 = st.columns(4)
@@ -363,7 +602,7 @@ with tab2:
             st.metric("Tax Year", "2024")  # Default since K1Fields doesn't track this
         
         with col4:
-            st.metric("Processing Time", f"{result.processing_time:.2f}s")
+            st.metric("Processing Time", f"{meta['processing_time']:.2f}s")
         
         st.divider()
         
@@ -371,17 +610,14 @@ with tab2:
         
         # Entity Information
         with st.expander("🏢 **Entity Information**", expanded=True):
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.text_input("EIN", value=data.part_i_a_ein or "", disabled=True)
-                st.text_input("Entity Name", value=data.part_i_b_name or "", disabled=True)
-                st.text_area("Entity Address", value=data.part_i_b_address or "", disabled=True, height=100)
-            
-            with col2:
-                st.text_input("Partner Name", value=data.part_ii_f_partner_name or "", disabled=True)
-                st.text_input("Partner SSN/EIN", value=data.part_ii_e_partner_tin or "", disabled=True)
-                st.text_area("Partner Address", value=data.part_ii_f_partner_address or "", disabled=True, height=100)
+            show_fields({
+                "EIN": data.part_i_a_ein or "",
+                "Entity Name": data.part_i_b_name or "",
+                "Entity Address": data.part_i_b_address or "",
+                "Partner Name": data.part_ii_f_partner_name or "",
+                "Partner SSN/EIN": data.part_ii_e_partner_tin or "",
+                "Partner Address": data.part_ii_f_partner_address or "",
+            })
         
         # Income Section
         with st.expander("💰 **Income (Boxes 1-11)**", expanded=True):
@@ -404,72 +640,30 @@ with tab2:
                 "Box 10 - Section 1231": format_currency(data.part_iii_10_net_section_1231),
             }
             
-            # Display in columns (update the split since we now have 16 items instead of 11)
-            col1, col2 = st.columns(2)
-            items = list(income_data.items())
-            
-            with col1:
-                for label, value in items[:8]:  # First 8 items
-                    st.text_input(label, value=value, disabled=True)
-            
-            with col2:
-                for label, value in items[8:]:  # Remaining 8 items
-                    st.text_input(label, value=value, disabled=True)
+            show_fields(income_data)
             
             # Show total
-            total_income = sum(v or 0 for v in [
-                data.part_iii_1_ordinary_income,
-                data.part_iii_2_rental_real_estate,
-                data.part_iii_3_other_rental,
-                data.part_iii_4a_guaranteed_payments_services,
-                data.part_iii_4b_guaranteed_payments_capital,
-                data.part_iii_4c_total_guaranteed_payments,
-                data.part_iii_5_interest_income,
-                data.part_iii_6a_ordinary_dividends,
-                data.part_iii_6b_qualified_dividends,
-                data.part_iii_6c_dividend_equivalents,
-                data.part_iii_7_royalties,
-                data.part_iii_8_net_short_term_gain,
-                data.part_iii_9a_net_long_term_gain,
-                data.part_iii_9b_collectibles_gain,
-                data.part_iii_9c_unrecaptured_1250,
-                data.part_iii_10_net_section_1231
-            ] if isinstance(v, (int, float)))
+            total_income = meta['total_income']
             st.info(f"📊 **Total Income: {format_currency(total_income)}**")
         
         # Capital Account
         with st.expander("🏦 **Capital Account**", expanded=True):
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.text_input("Beginning Capital", value=format_currency(data.part_ii_l_beginning_capital), disabled=True)
-                st.text_input("Contributions", value=format_currency(data.part_ii_l_capital_contributed), disabled=True)
-                st.text_input("Current Year Net Income (Loss)", value=format_currency(data.part_ii_l_current_year_income), disabled=True)
-            
-            with col2:
-                st.text_input("Other Increase (Decrease)", value=format_currency(data.part_ii_l_other_increase), disabled=True)
-                st.text_input("Distributions", value=format_currency(data.part_ii_l_withdrawals_distributions), disabled=True)
-                st.text_input("Ending Capital", value=format_currency(data.part_ii_l_ending_capital), disabled=True)
-            
-            # Validation
-            beginning = data.part_ii_l_beginning_capital or 0
-            contributed = data.part_ii_l_capital_contributed or 0
-            income = data.part_ii_l_current_year_income or 0
-            other_increase = data.part_ii_l_other_increase or 0
-            distributions = data.part_ii_l_withdrawals_distributions or 0
-            ending = data.part_ii_l_ending_capital or 0
-            
-            # Convert string values to float if needed
-            if isinstance(other_increase, str):
-                try:
-                    other_increase = float(other_increase)
-                except:
-                    other_increase = 0
+            show_fields({
+                "Beginning Capital": format_currency(data.part_ii_l_beginning_capital),
+                "Contributions": format_currency(data.part_ii_l_capital_contributed),
+                "Current Year Net Income (Loss)": format_currency(data.part_ii_l_current_year_income),
+                "Other Increase (Decrease)": format_currency(data.part_ii_l_other_increase),
+                "Distributions": format_currency(data.part_ii_l_withdrawals_distributions),
+                "Ending Capital": format_currency(data.part_ii_l_ending_capital),
+            })
             
-            calculated = beginning + contributed + income + other_increase - distributions
-            difference = ending - calculated
+            # Validation (reconciled once at extraction time)
+            capital = meta['capital']
+            beginning, contributed, income = capital['beginning'], capital['contributed'], capital['income']
+            other_increase, distributions = capital['other_increase'], capital['distributions']
+            ending, calculated, difference = capital['ending'], capital['calculated'], capital['difference']
             
-            if abs(difference) < 1.0:
+            if capital['reconciles']:
                 st.success("✅ Capital account reconciles")
             else:
                 st.error("❌ Capital account does not reconcile")
@@ -563,14 +757,11 @@ Beginning Capital
         
         # Ownership Percentages
         with st.expander("📊 **Ending Ownership Percentages**", expanded=False):
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                st.text_input("Profit %", value=format_percentage(data.part_ii_j_profit_ending), disabled=True)
-            with col2:
-                st.text_input("Loss %", value=format_percentage(data.part_ii_j_loss_ending), disabled=True)
-            with col3:
-                st.text_input("Capital %", value=format_percentage(data.part_ii_j_capital_ending), disabled=True)
+            show_fields({
+                "Profit %": format_percentage(data.part_ii_j_profit_ending),
+                "Loss %": format_percentage(data.part_ii_j_loss_ending),
+                "Capital %": format_percentage(data.part_ii_j_capital_ending),
+            })
         
         # Raw text (optional)
         if show_raw_text:
@@ -582,10 +773,10 @@ Beginning Capital
         st.subheader("📥 Export Options")
         
         col1, col2, col3 = st.columns(3)
+        json_data, csv_data = build_exports(data_dict)
         
         with col1:
             # Export as JSON
-            json_data = json.dumps(data.__dict__, indent=2, default=str)
             st.download_button(
                 label="📄 Download as JSON",
                 data=json_data,
@@ -596,24 +787,6 @@ Beginning Capital
         
         with col2:
             # Export as CSV - vertical format
-            # Create a DataFrame with Field and Value columns
-            csv_data_dict = {
-                'Field': [],
-                'Value': []
-            }
-            
-            # Add all non-None fields to the CSV
-            for field_name, field_value in data.__dict__.items():
-                if not field_name.startswith('_') and field_value is not None:
-                    csv_data_dict['Field'].append(field_name)
-                    # Format the value appropriately
-                    if isinstance(field_value, (int, float)):
-                        csv_data_dict['Value'].append(field_value)
-                    else:
-                        csv_data_dict['Value'].append(str(field_value))
-            
-            df_vertical = pd.DataFrame(csv_data_dict)
-            csv_data = df_vertical.to_csv(index=False)
             st.download_button(
                 label="📊 Download as CSV",
                 data=csv_data,
@@ -625,19 +798,25 @@ Beginning Capital
         with col3:
             # Copy to clipboard (using a code block as workaround)
             if st.button("📋 Copy Summary", use_container_width=True):
-                summary = {k: v for k, v in data.__dict__.items() if v is not None}
+                summary = {k: v for k, v in data_dict.items() if v is not None}
                 st.code(json.dumps(summary, indent=2, default=str), language="json")
     
     else:
         st.info("👆 Upload a K-1 PDF in the Upload tab to see results here")
 
+with tab2:
+    render_results_tab(show_raw_text)
+
 # ============================================================================
 # TAB 3: ANALYSIS
 # ============================================================================
 
-with tab3:
-    if st.session_state.current_result and st.session_state.current_result.success:
-        data = st.session_state.current_result.data
+@st.fragment
+def render_analysis_tab() -> None:
+    """Analysis tab: completeness, income breakdown and extraction quality."""
+    if st.session_state.current_meta and st.session_state.current_meta['success']:
+        data = st.session_state.current_data
+        data_dict = st.session_state.current_data_dict
         
         st.header("📈 Data Analysis")
         
@@ -648,8 +827,8 @@ with tab3:
             st.subheader("Field Completeness")
             
             # Count filled fields
-            all_fields = data.__dict__
-            filled_fields = {k: v for k, v in all_fields.items() if v is not None and not k.startswith('_')}
+            all_fields = data_dict
+            filled_fields = {k: v for k, v in all_fields.items() if v is not None}
             
             completeness_data = {
                 "Total Fields": len(all_fields),
@@ -664,35 +843,30 @@ with tab3:
         with col2:
             st.subheader("Income Breakdown")
             
-            # Create income breakdown chart
-            income_items = {
-                "Ordinary Income": data.part_iii_1_ordinary_income or 0,
-                "Rental Income": data.part_iii_2_rental_real_estate or 0,
-                "Interest": data.part_iii_5_interest_income or 0,
-                "Dividends": data.part_iii_6a_ordinary_dividends or 0,
-                "Other": 0  # No direct equivalent in K1Fields
-            }
-            
-            # Filter out zero values
-            income_items = {k: v for k, v in income_items.items() if v != 0}
+            # Create income breakdown chart, dropping zero categories
+            income_values = np.array([
+                data.part_iii_1_ordinary_income or 0,
+                data.part_iii_2_rental_real_estate or 0,
+                data.part_iii_5_interest_income or 0,
+                data.part_iii_6a_ordinary_dividends or 0,
+            ], dtype=np.float64)
+            nonzero = income_values != 0
             
-            if income_items:
-                df = pd.DataFrame(list(income_items.items()), columns=['Category', 'Amount'])
-                st.bar_chart(df.set_index('Category'))
+            if nonzero.any():
+                import pandas as pd
+                st.bar_chart(pd.Series(
+                    income_values[nonzero],
+                    index=pd.Index(INCOME_CATEGORIES[nonzero], name='Category'),
+                    name='Amount'
+                ))
             else:
                 st.info("No income data to display")
         
         # Field-by-field confidence (if we had per-field confidence)
         st.subheader("Extraction Quality")
         
-        # Calculate capital reconciliation
-        beginning = data.part_ii_l_beginning_capital or 0
-        contributed = data.part_ii_l_capital_contributed or 0
-        income = data.part_ii_l_current_year_income or 0
-        distributions = data.part_ii_l_withdrawals_distributions or 0
-        ending = data.part_ii_l_ending_capital or 0
-        calculated = beginning + contributed + income - distributions
-        reconciles = abs(calculated - ending) < 1.0
+        # Capital reconciliation, computed at extraction time
+        reconciles = st.session_state.current_meta['capital']['reconciles']
         
         quality_metrics = {
             "Overall Confidence": "90%",  # Default confidence
@@ -708,30 +882,24 @@ with tab3:
     else:
         st.info("👆 Upload and process a K-1 to see analysis")
 
+with tab3:
+    render_analysis_tab()
+
 # ============================================================================
 # TAB 4: HISTORY
 # ============================================================================
 
-with tab4:
+@st.fragment
+def render_history_tab() -> None:
+    """History tab: recent extractions and their statistics."""
     st.header("📜 Processing History")
     
     if st.session_state.extraction_history:
-        # Create history dataframe
-        history_data = []
-        for item in st.session_state.extraction_history:
-            history_data.append({
-                "Timestamp": item['timestamp'].strftime("%Y-%m-%d %H:%M:%S"),
-                "Filename": item['filename'],
-                "Status": "✅ Success" if item['success'] else "❌ Failed",
-                "Confidence": f"{item.get('confidence', 0):.0%}" if item.get('confidence') else "—",
-                "Error": item.get('error', '—')
-            })
-        
-        df = pd.DataFrame(history_data)
+        history_df = st.session_state.history_df
         
         # Display with custom styling
         st.dataframe(
-            df,
+            history_df,
             use_container_width=True,
             hide_index=True,
             column_config={
@@ -742,22 +910,24 @@ with tab4:
                 "Error": st.column_config.TextColumn("Error")
             }
         )
+        if st.session_state.hist_count > MAX_HISTORY:
+            st.caption(f"Showing the {MAX_HISTORY} most recent of {st.session_state.hist_count} extractions")
         
         # Summary statistics
         st.divider()
         col1, col2, col3 = st.columns(3)
+        successful = st.session_state.hist_success_count
+        failed = st.session_state.hist_count - successful
+        avg_conf = st.session_state.hist_conf_sum / successful if successful > 0 else None
         
         with col1:
-            successful = sum(1 for item in st.session_state.extraction_history if item['success'])
             st.metric("Successful", successful)
         
         with col2:
-            failed = len(st.session_state.extraction_history) - successful
             st.metric("Failed", failed)
         
         with col3:
-            if successful > 0:
-                avg_conf = sum(item.get('confidence', 0) for item in st.session_state.extraction_history if item.get('confidence')) / successful
+            if avg_conf is not None:
                 st.metric("Avg Confidence", f"{avg_conf:.0%}")
             else:
                 st.metric("Avg Confidence", "—")
@@ -765,6 +935,9 @@ with tab4:
     else:
         st.info("No processing history yet. Upload a K-1 to get started!")
 
+with tab4:
+    render_history_tab()
+
 # ============================================================================
 # FOOTER
 # ============================================================================
@@ -773,7 +946,7 @@ st.divider()
 st.markdown(
     """
     <div style='text-align: center; color: #888; padding: 2rem;'>
-        <p>K-1 Reader v1.0 | Built with Streamlit, PyPDF, and Tesseract</p>
+        <p>K-1 Reader v1.0 | Built with Streamlit and PyMuPDF</p>
         <p>For demonstration purposes only - Always verify extracted data</p>
     </div>
     """,
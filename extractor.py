@@ -5,15 +5,31 @@ K-1 form field extractor with comprehensive field mappings
 Based on actual field structure from fillable PDF forms
 """
 
+import io
+import json
+import os
 import re
-import pdfplumber
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import fitz  # PyMuPDF
+from pypdf import PdfReader
 from typing import Dict, List, Optional, Any, Union
 from dataclasses import dataclass, field
-import json
 from datetime import datetime
 
+# Only used for the debug dump; stdlib json is the fallback
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Bump when a change alters what extraction returns for the same PDF; the
+# app keys its result cache on it
+EXTRACTOR_VERSION = 1
 
-@dataclass
+
+@dataclass(slots=True)
 class K1Fields:
     """Complete K-1 form field structure"""
     
@@ -100,6 +116,30 @@ class K1Fields:
     part_iii_23_multiple_passive: Optional[bool] = None
 
 
+# Substrings marking a K1Fields attribute as a dollar amount
+_NUMERIC_KEYWORDS = (
+    'capital', 'income', 'gain', 'loss', 'distributions',
+    'payment', 'dividend', 'interest', 'royalties', 'deduction',
+    'nonrecourse', 'recourse', 'qualified', 'amt', 'foreign',
+    'rental', 'ordinary', 'section', 'unrecaptured'
+)
+
+# First number in a value that didn't parse as a whole
+_NUM_RE = re.compile(r'-?\d+\.?\d*')
+
+# CRLF or lone CR line breaks, normalized to \n in one pass
+_CRLF_RE = re.compile(r'\r\n?')
+
+# Combined name/address text fields, split into their (name, address) attributes
+_COMPOUND_FIELDS = {
+    'part_i_b_name_address': ('part_i_b_name', 'part_i_b_address'),
+    'part_ii_f_partner_name_address': ('part_ii_f_partner_name', 'part_ii_f_partner_address'),
+}
+
+# Checkbox /AS states that mean "not checked"
+_UNCHECKED_STATES = frozenset(["/'Off'", "/Off", "Off", "/'0'", "/0", "0"])
+
+
 class K1Extractor:
     """
     Production K-1 form field extractor with comprehensive mappings
@@ -188,158 +228,308 @@ class K1Extractor:
         'c1_14[0]': ('part_iii_23_multiple_passive', True),
     }
     
+    # PDF field name -> ('text', k1_field), ('compound', (k1_field, name_attr, address_attr))
+    # or ('checkbox', (k1_field, value)), so mapping a field is a single lookup
+    _DISPATCH = {
+        **{name: ('compound', (k1_field, *_COMPOUND_FIELDS[k1_field])) if k1_field in _COMPOUND_FIELDS else ('text', k1_field)
+           for name, k1_field in FIELD_MAPPINGS.items()},
+        **{name: ('checkbox', target) for name, target in CHECKBOX_MAPPINGS.items()},
+    }
+    
+    # Every PDF field name the mappings know about
+    _KNOWN_KEYS = frozenset(_DISPATCH)
+    
+    # Mapped text fields that hold dollar amounts
+    _NUMERIC_FIELD_SET = frozenset(
+        name for name in FIELD_MAPPINGS.values()
+        if any(keyword in name for keyword in _NUMERIC_KEYWORDS)
+    )
+    
+    # Remaining mapped Item J ownership percentages (beginning/ending profit, loss, capital)
+    _PERCENT_FIELD_SET = frozenset(
+        name for name in FIELD_MAPPINGS.values()
+        if ('profit' in name or 'loss' in name or 'capital' in name)
+        and ('beginning' in name or 'ending' in name)
+    ) - _NUMERIC_FIELD_SET
+    
+    # Parse path for each mapped text field ('numeric', 'percent' or 'ein');
+    # anything absent is plain text and returned as cleaned
+    _FIELD_CATEGORY = {
+        **dict.fromkeys(_NUMERIC_FIELD_SET, 'numeric'),
+        **dict.fromkeys(_PERCENT_FIELD_SET, 'percent'),
+        'part_i_a_ein': 'ein',
+    }
+    
+    # Log lines kept in memory; a long-lived extractor (e.g. the app's shared
+    # instance) drops the oldest ones beyond this
+    MAX_LOG_ENTRIES = 1000
+    
     def __init__(self, verbose: bool = True, debug: bool = False):
         self.verbose = verbose
         self.debug = debug
         self.raw_fields = {}
         self.extraction_log = []
+        # Nobody reads the log unless verbose or debug; skip building it otherwise
+        self._log_enabled = verbose or debug
+        # Verbose console lines, written out in one go per extraction
+        self._pending_output: List[str] = []
+        # Populated-field count of the last extraction, reused by the summary
+        self._last_k1_data: Optional[K1Fields] = None
+        self._last_populated = 0
+        
+    def log(self, message: str, *args: Any, level: str = "INFO"):
+        """
+        Log message with timestamp and level
         
-    def log(self, message: str, level: str = "INFO"):
-        """Log message with timestamp and level"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
+        Any args are %-formatted into message, and only once the entry is
+        actually recorded.
+        """
+        if not self._log_enabled:
+            return
+        if args:
+            message = message % args
+        timestamp = time.strftime("%H:%M:%S")
         log_entry = f"[{timestamp}] [{level}] {message}"
         self.extraction_log.append(log_entry)
+        if len(self.extraction_log) > 2 * self.MAX_LOG_ENTRIES:
+            del self.extraction_log[:-self.MAX_LOG_ENTRIES]
         
         if self.verbose:
-            print(log_entry)
+            self._pending_output.append(log_entry)
+    
+    def _flush_output(self):
+        """Write the buffered verbose log lines to stdout"""
+        # Swap the buffer out first: the app shares one extractor across
+        # threads, and lines logged during the write go to the new list
+        pending, self._pending_output = self._pending_output, []
+        if pending:
+            sys.stdout.write('\n'.join(pending) + '\n')
+            sys.stdout.flush()
     
     def extract_from_pdf(self, pdf_path: str) -> K1Fields:
         """
         Main extraction method
         """
-        self.log(f"Starting extraction from: {pdf_path}")
+        self.log("Starting extraction from: %s", pdf_path)
+        try:
+            return self._extract(pdf_path)
+        finally:
+            self._flush_output()
+    
+    def extract_from_bytes(self, data: bytes, name: str = "<memory>") -> K1Fields:
+        """
+        Extract from a PDF already held in memory (e.g. an upload), without
+        a temp file round-trip. name is only used for logging.
+        """
+        self.log("Starting extraction from: %s", name)
+        try:
+            return self._extract(data)
+        finally:
+            self._flush_output()
+    
+    @classmethod
+    def extract_many(cls, paths: List[str], workers: Optional[int] = None) -> Dict[str, K1Fields]:
+        """
+        Extract several PDFs in parallel, one quiet extractor per worker process.
+        Returns results keyed by path, in the order given.
+        """
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return dict(zip(paths, pool.map(_extract_file, paths)))
+    
+    def _extract(self, source: Union[str, bytes]) -> K1Fields:
+        """Extract from a PDF path or the PDF's bytes"""
         k1_data = K1Fields()
         
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                if not pdf.pages:
-                    self.log("No pages found in PDF", "ERROR")
+            # PyMuPDF reads the form widgets straight from the MuPDF C parser
+            if isinstance(source, bytes):
+                doc = fitz.open(stream=source, filetype="pdf")
+            else:
+                doc = fitz.open(source)
+            with doc:
+                if doc.page_count == 0:
+                    self.log("No pages found in PDF", level="ERROR")
                     return k1_data
                 
-                page = pdf.pages[0]
-                self.log(f"Processing page 1 of {len(pdf.pages)}")
+                page = doc[0]
+                self.log("Processing page 1 of %d", doc.page_count)
                 
                 # Extract form field annotations
                 self.log("Extracting form field annotations...")
-                form_data = self._extract_annotations(page)
-                
-                if form_data:
-                    self.log(f"Successfully extracted {len(form_data)} form fields", "SUCCESS")
-                    k1_data = self._apply_field_mappings(form_data, k1_data)
-                else:
-                    self.log("No form fields found", "WARNING")
+                form_data = self._extract_widgets(page)
+            
+            if not form_data:
+                form_data = self._extract_annotations_fallback(source)
+            
+            if form_data:
+                self.log("Successfully extracted %d form fields", len(form_data), level="SUCCESS")
+                k1_data = self._apply_field_mappings(form_data)
+            else:
+                self.log("No form fields found", level="WARNING")
                 
         except Exception as e:
-            self.log(f"Extraction error: {e}", "ERROR")
+            self.log("Extraction error: %s", e, level="ERROR")
             if self.debug:
                 import traceback
+                self._flush_output()
                 traceback.print_exc()
         
-        self.log(f"Extraction complete. Fields populated: {self._count_populated_fields(k1_data)}")
+        self._last_k1_data = k1_data
+        self._last_populated = self._count_populated_fields(k1_data)
+        self.log("Extraction complete. Fields populated: %d", self._last_populated)
         return k1_data
     
+    def _extract_widgets(self, page) -> Dict[str, Any]:
+        """Extract data from form field widgets on a PyMuPDF page"""
+        form_data = {}
+        
+        widgets = list(page.widgets())
+        if not widgets:
+            return form_data
+        
+        self.log("Found %d annotations", len(widgets))
+        doc = page.parent
+        
+        for widget in widgets:
+            # Fully qualified names look like 'topmostSubform[0].Page1[0].f1_6[0]';
+            # the mappings are keyed by the last part
+            field_name = (widget.field_name or '').rsplit('.', 1)[-1]
+            if not field_name:
+                continue
+            
+            # Extract checkbox state (raw /AS name, as pdfplumber reports it)
+            if widget.field_type in (fitz.PDF_WIDGET_TYPE_CHECKBOX, fitz.PDF_WIDGET_TYPE_RADIOBUTTON):
+                kind, state = doc.xref_get_key(widget.xref, "AS")
+                if kind != 'null':
+                    form_data[field_name] = state
+                    if self.debug:
+                        self.log("  Checkbox '%s': %s", field_name, state, level="DEBUG")
+            
+            # Extract text field value
+            else:
+                value = widget.field_value
+                if isinstance(value, str):
+                    value = _CRLF_RE.sub('\n', value).strip()
+                
+                if value:
+                    form_data[field_name] = value
+                    if self.debug:
+                        self.log("  Text field '%s': %.50s...", field_name, value, level="DEBUG")
+        
+        self.raw_fields = form_data
+        return form_data
+    
+    def _extract_annotations_fallback(self, source: Union[str, bytes]) -> Dict[str, Any]:
+        """Read page 1 annotations with pypdf when MuPDF exposes no widgets"""
+        self.log("No widgets found, falling back to pypdf annotations", level="WARNING")
+        
+        if isinstance(source, bytes):
+            source = io.BytesIO(source)
+        # pypdf only parses the objects we touch - no layout analysis
+        reader = PdfReader(source)
+        if not reader.pages:
+            return {}
+        return self._extract_annotations(reader.pages[0])
+    
     def _extract_annotations(self, page) -> Dict[str, Any]:
         """Extract data from PDF annotations (form fields)"""
         form_data = {}
         
-        if not hasattr(page, 'annots') or not page.annots:
+        annots = page.get('/Annots')
+        if not annots:
             return form_data
+        annots = annots.get_object()
         
-        self.log(f"Found {len(page.annots)} annotations")
+        self.log("Found %d annotations", len(annots))
         
-        for annot in page.annots:
-            try:
-                field_name = annot.get('title', '')
-                if not field_name:
-                    continue
-                
-                annot_data = annot.get('data', {})
-                value = None
-                
-                # Extract text field value
-                if 'V' in annot_data:
-                    value = annot_data['V']
-                    if isinstance(value, bytes):
-                        value = value.decode('utf-8', errors='ignore')
-                        value = value.strip().replace('\r\n', '\n').replace('\r', '\n')
-                    
-                    if value:
-                        form_data[field_name] = value
-                        if self.debug:
-                            self.log(f"  Text field '{field_name}': {value[:50]}...", "DEBUG")
+        # Malformed files raise out of here; _extract logs the error
+        for annot_ref in annots:
+            annot = annot_ref.get_object()
+            field_name = annot.get('/T')
+            if not field_name:
+                continue
+            field_name = str(field_name)
+            
+            # Extract text field value
+            value = annot.get('/V')
+            if value is not None:
+                if isinstance(value, bytes):
+                    value = value.decode('utf-8', errors='ignore')
+                if isinstance(value, str):
+                    value = _CRLF_RE.sub('\n', value).strip()
                 
-                # Extract checkbox state
-                elif 'AS' in annot_data:
-                    state = str(annot_data['AS'])
-                    form_data[field_name] = state
+                if value:
+                    form_data[field_name] = value
                     if self.debug:
-                        self.log(f"  Checkbox '{field_name}': {state}", "DEBUG")
-                
-            except Exception as e:
+                        self.log("  Text field '%s': %.50s...", field_name, value, level="DEBUG")
+            
+            # Extract checkbox state
+            elif '/AS' in annot:
+                state = str(annot['/AS'])
+                form_data[field_name] = state
                 if self.debug:
-                    self.log(f"  Error processing annotation: {e}", "DEBUG")
+                    self.log("  Checkbox '%s': %s", field_name, state, level="DEBUG")
         
         self.raw_fields = form_data
         return form_data
     
-    def _apply_field_mappings(self, form_data: Dict[str, Any], k1_data: K1Fields) -> K1Fields:
-        """Apply field mappings to populate K1Fields"""
+    def _apply_field_mappings(self, form_data: Dict[str, Any]) -> K1Fields:
+        """Apply field mappings and build the populated K1Fields"""
         
+        # Collected as constructor kwargs; later fields win, as with setattr
+        fields = {}
         mapped_count = 0
         
-        # Process text fields
+        # A fillable PDF that isn't a K-1 shares no field names with the
+        # mappings; skip the walk over its fields entirely
+        if self._KNOWN_KEYS.isdisjoint(form_data):
+            self.log("Total fields mapped: 0", level="SUCCESS")
+            return K1Fields()
+        
+        # Walk form_data rather than the intersection with _KNOWN_KEYS: set
+        # order isn't stable, and document order decides which widget of a
+        # Yes/No pair wins
         for field_name, value in form_data.items():
-            if field_name in self.FIELD_MAPPINGS:
-                k1_field = self.FIELD_MAPPINGS[field_name]
+            entry = self._DISPATCH.get(field_name)
+            if entry is None:
+                continue
+            kind, target = entry
+            
+            # Process text fields
+            if kind == 'text':
+                processed_value = self._process_field_value(value, target)
+                fields[target] = processed_value
+                mapped_count += 1
+                if self._log_enabled:
+                    self.log("Mapped %s -> %s: %s", field_name, target, processed_value, level="MAP")
+            
+            # Handle compound fields: first line is the name, the rest the address
+            elif kind == 'compound':
+                k1_field, name_attr, address_attr = target
                 processed_value = self._process_field_value(value, k1_field)
-                
-                # Handle compound fields
-                if k1_field == 'part_i_b_name_address':
-                    lines = processed_value.split('\n') if processed_value else []
-                    if lines:
-                        k1_data.part_i_b_name = lines[0].strip()
-                        if len(lines) > 1:
-                            k1_data.part_i_b_address = '\n'.join(lines[1:]).strip()
-                        mapped_count += 2
-                        self.log(f"Mapped {field_name} -> part_i_b_name: {k1_data.part_i_b_name}", "MAP")
-                        self.log(f"Mapped {field_name} -> part_i_b_address: {k1_data.part_i_b_address[:30]}...", "MAP")
-                
-                elif k1_field == 'part_ii_f_partner_name_address':
-                    lines = processed_value.split('\n') if processed_value else []
-                    if lines:
-                        k1_data.part_ii_f_partner_name = lines[0].strip()
-                        if len(lines) > 1:
-                            k1_data.part_ii_f_partner_address = '\n'.join(lines[1:]).strip()
-                        mapped_count += 2
-                        self.log(f"Mapped {field_name} -> part_ii_f_partner_name: {k1_data.part_ii_f_partner_name}", "MAP")
-                        self.log(f"Mapped {field_name} -> part_ii_f_partner_address: {k1_data.part_ii_f_partner_address[:30]}...", "MAP")
-                
-                else:
-                    setattr(k1_data, k1_field, processed_value)
-                    mapped_count += 1
-                    self.log(f"Mapped {field_name} -> {k1_field}: {processed_value}", "MAP")
+                if processed_value:
+                    name, sep, address = processed_value.partition('\n')
+                    fields[name_attr] = name.strip()
+                    if sep:
+                        fields[address_attr] = address.strip()
+                    mapped_count += 2
+                    if self._log_enabled:
+                        self.log("Mapped %s -> %s: %s", field_name, name_attr, fields[name_attr], level="MAP")
+                        self.log("Mapped %s -> %s: %.30s...", field_name, address_attr, fields.get(address_attr) or '', level="MAP")
             
             # Process checkboxes
-            elif field_name in self.CHECKBOX_MAPPINGS:
-                k1_field, checkbox_value = self.CHECKBOX_MAPPINGS[field_name]
+            else:
+                k1_field, checkbox_value = target
                 
                 # Check if checkbox is checked
-                state = str(value)
-                is_checked = state not in ["/'Off'", "/Off", "Off", "/'0'", "/0", "0"]
-                
-                if is_checked:
-                    # For boolean fields
-                    if isinstance(checkbox_value, bool):
-                        setattr(k1_data, k1_field, checkbox_value)
-                    # For string value fields (like partner type)
-                    else:
-                        setattr(k1_data, k1_field, checkbox_value)
-                    
+                if str(value) not in _UNCHECKED_STATES:
+                    fields[k1_field] = checkbox_value
                     mapped_count += 1
-                    self.log(f"Mapped checkbox {field_name} -> {k1_field}: {getattr(k1_data, k1_field)}", "MAP")
+                    if self._log_enabled:
+                        self.log("Mapped checkbox %s -> %s: %s", field_name, k1_field, checkbox_value, level="MAP")
         
-        self.log(f"Total fields mapped: {mapped_count}", "SUCCESS")
-        return k1_data
+        self.log("Total fields mapped: %d", mapped_count, level="SUCCESS")
+        return K1Fields(**fields)
     
     def _process_field_value(self, value: Any, field_name: str) -> Any:
         """Process and clean field values"""
@@ -350,25 +540,21 @@ class K1Extractor:
         # Convert to string for processing
         value_str = str(value).strip()
         
-        # Clean checkbox values
-        if value_str.startswith("/'") and value_str.endswith("'"):
-            value_str = value_str[2:-1]
-        elif value_str.startswith("/"):
-            value_str = value_str[1:]
+        # Clean checkbox values (/Name, or pdfminer-style /'Name'); plain text
+        # values pay for a single prefix check
+        if value_str.startswith("/"):
+            if value_str.startswith("/'") and value_str.endswith("'"):
+                value_str = value_str[2:-1]
+            else:
+                value_str = value_str[1:]
         
-        # Special processing for EIN
-        if field_name == 'part_i_a_ein' and len(value_str) == 8 and '-' in value_str:
-            return value_str + '89'  # Complete partial EIN
+        # Text fields (names, addresses, codes) need no further parsing
+        category = self._FIELD_CATEGORY.get(field_name)
+        if category is None:
+            return value_str
         
         # Process numeric fields - be more aggressive about converting to float
-        numeric_fields = [
-            'capital', 'income', 'gain', 'loss', 'distributions',
-            'payment', 'dividend', 'interest', 'royalties', 'deduction',
-            'nonrecourse', 'recourse', 'qualified', 'amt', 'foreign',
-            'rental', 'ordinary', 'section', 'unrecaptured'
-        ]
-        
-        if any(keyword in field_name for keyword in numeric_fields):
+        if category == 'numeric':
             # Clean numeric value
             cleaned = value_str.replace('$', '').replace(',', '').strip()
             
@@ -378,41 +564,40 @@ class K1Extractor:
             
             try:
                 return float(cleaned)
-            except:
+            except ValueError:
                 # Try one more time with just digits and decimal/minus
-                import re
-                num_match = re.search(r'-?\d+\.?\d*', cleaned)
-                if num_match:
-                    try:
-                        return float(num_match.group())
-                    except:
-                        pass
-                return value_str
+                # (any _NUM_RE match is a valid float literal)
+                num_match = _NUM_RE.search(cleaned)
+                return float(num_match.group()) if num_match else value_str
         
         # Process percentage fields
-        if ('profit' in field_name or 'loss' in field_name or 'capital' in field_name) and \
-           ('beginning' in field_name or 'ending' in field_name):
+        if category == 'percent':
             try:
                 return float(value_str.replace('%', '').strip())
-            except:
+            except ValueError:
                 return value_str
         
+        # Special processing for EIN
+        if len(value_str) == 8 and '-' in value_str:
+            return value_str + '89'  # Complete partial EIN
+        
         return value_str
     
     def _count_populated_fields(self, k1_data: K1Fields) -> int:
         """Count non-None fields in K1Fields"""
-        count = 0
-        for field_name in dir(k1_data):
-            if not field_name.startswith('_'):
-                value = getattr(k1_data, field_name)
-                if value is not None and value != [] and value != "":
-                    count += 1
-        return count
+        return sum(
+            1 for name in k1_data.__dataclass_fields__
+            if (value := getattr(k1_data, name)) is not None and value != [] and value != ""
+        )
     
     def get_extraction_summary(self, k1_data: K1Fields) -> Dict:
         """Generate extraction summary"""
-        total_fields = sum(1 for f in dir(k1_data) if not f.startswith('_'))
-        populated_fields = self._count_populated_fields(k1_data)
+        total_fields = len(k1_data.__dataclass_fields__)
+        # The result of our own last extraction was already counted
+        if k1_data is self._last_k1_data:
+            populated_fields = self._last_populated
+        else:
+            populated_fields = self._count_populated_fields(k1_data)
         
         summary = {
             'total_fields': total_fields,
@@ -431,21 +616,32 @@ class K1Extractor:
             'raw_fields': self.raw_fields,
             'extraction_summary': self.get_extraction_summary(k1_data),
             'populated_fields': {
-                field_name: getattr(k1_data, field_name)
-                for field_name in dir(k1_data)
-                if not field_name.startswith('_') and getattr(k1_data, field_name) is not None
+                field_name: value
+                for field_name in k1_data.__dataclass_fields__
+                if (value := getattr(k1_data, field_name)) is not None
             }
         }
         
-        with open(output_file, 'w') as f:
-            json.dump(debug_info, f, indent=2, default=str)
+        if orjson is not None:
+            with open(output_file, 'wb') as f:
+                f.write(orjson.dumps(debug_info, default=str, option=orjson.OPT_INDENT_2))
+        else:
+            with open(output_file, 'w') as f:
+                json.dump(debug_info, f, indent=2, default=str)
         
-        self.log(f"Debug info saved to: {output_file}", "SUCCESS")
+        self.log("Debug info saved to: %s", output_file, level="SUCCESS")
+        self._flush_output()
+
+
+def _extract_file(pdf_path: str) -> K1Fields:
+    """Worker for K1Extractor.extract_many (module level so it pickles)"""
+    return K1Extractor(verbose=False).extract_from_pdf(pdf_path)
 
 
 def main():
     """Main extraction function"""
     import sys
+    from glob import glob
     
     pdf_path = sys.argv[1] if len(sys.argv) > 1 else "Input/Sample_MadeUp.pdf"
     
@@ -453,6 +649,19 @@ def main():
     print("K-1 FORM FIELD EXTRACTION")
     print("="*70)
     
+    # A directory is processed as a batch, one worker process per core
+    if os.path.isdir(pdf_path):
+        pdf_paths = sorted(glob(os.path.join(pdf_path, "*.pdf")))
+        results = K1Extractor.extract_many(pdf_paths)
+        
+        counter = K1Extractor(verbose=False)
+        total_fields = len(K1Fields.__dataclass_fields__)
+        for path, k1_data in results.items():
+            print(f"{os.path.basename(path)}: {counter._count_populated_fields(k1_data)}/{total_fields} fields populated")
+        print(f"\nProcessed {len(results)} PDF(s)")
+        
+        return results
+    
     extractor = K1Extractor(verbose=True, debug=False)
     k1_data = extractor.extract_from_pdf(pdf_path)
     
@@ -1,5 +1,5 @@
 # Data structures
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 from enum import Enum
@@ -234,12 +234,9 @@ class K1Data(BaseModel):
     )
 
     # === PYDANTIC CONFIGURATION ===
-    class Config:
-        "Tell Pydantic how to handle this model"
-        json_encoders = {
-            datetime: lambda v: v.isoformat()  # Convert datetime to string
-        }
-        schema_extra = {
+    # Tell Pydantic how to handle this model (datetimes already dump as ISO strings in v2)
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "form_type": "1065",
                 "tax_year": "2023",
@@ -248,6 +245,7 @@ class K1Data(BaseModel):
                 "box_1_ordinary_income": 50000.00
             }
         }
+    )
 
     # === BUSINESS LOGIC METHODS ===
     # PSEUDOCODE: Smart calculations on the extracted data